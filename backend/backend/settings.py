@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,6 +33,9 @@ CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',  # 假设前端运行在 localhost:5173
 ]
 
+# 跨域请求中前端只能读取这里列出的响应头；X-Refreshed-Token 携带续期后的 token（见 utils/jwt.py）
+CORS_EXPOSE_HEADERS = ['X-Refreshed-Token']
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -49,6 +54,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "utils.metrics.MetricsMiddleware",
+    "utils.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -61,6 +68,9 @@ MIDDLEWARE = [
 
 APPEND_SLASH = False
 
+# Requests issuing more SQL queries than this are logged and counted (see utils/metrics.py)
+METRICS_QUERY_BUDGET = int(os.environ.get("METRICS_QUERY_BUDGET", 20))
+
 ROOT_URLCONF = "backend.urls"
 
 TEMPLATES = [
@@ -87,12 +97,18 @@ WSGI_APPLICATION = "backend.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
-        "NAME": "book_trade",
-        "USER": "ricky",
-        "PASSWORD": "Ricky123456",
-        "HOST": "localhost",
-        "PORT": 15432,
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("DB_NAME", "book_trade"),
+        "USER": os.environ.get("DB_USER", "ricky"),
+        "PASSWORD": os.environ.get("DB_PASSWORD", "Ricky123456"),
+        "HOST": os.environ.get("DB_HOST", "localhost"),
+        "PORT": int(os.environ.get("DB_PORT", 15432)),
+        # 持久连接：连接在请求之间复用 DB_CONN_MAX_AGE 秒，复用前先做健康检查
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "connect_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT", 5)),
+        },
     }
     #'default': {
     #    'ENGINE': 'django.db.backends.sqlite3',  # 使用 SQLite 数据库
@@ -108,7 +124,60 @@ DATABASES = {
     #}
 }
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# The "books" cache holds book detail and list responses (see book/cache.py).
+# BOOK_CACHE_BACKEND=locmem keeps a per-process LRU; BOOK_CACHE_BACKEND=redis
+# shares one cache between all workers.
+#
+# Invalidation bumps a version counter in the cache, so with locmem it only
+# reaches the process that made the write. Detail and list keys (and their
+# ETags) also include a database probe of updated_at, so writes made by other
+# web workers and by management commands (expire_orders, import_books,
+# drain_cover_uploads) are seen either way; redis additionally shares the
+# cached responses between workers.
+
+BOOK_CACHE_BACKEND = os.environ.get("BOOK_CACHE_BACKEND", "locmem")
+
+# The "verification" cache holds verification codes and rate-limit buckets
+# (see user/verification.py) and must be shared by all workers: Redis when
+# REDIS_URL is set, otherwise a database table (created after `migrate`, see user/signals.py).
+VERIFICATION_CACHE_BACKEND = os.environ.get(
+    "VERIFICATION_CACHE_BACKEND", "redis" if os.environ.get("REDIS_URL") else "database"
+)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "books": {
+        "BACKEND": "book.cache.CountingLocMemCache",
+        "LOCATION": "books",
+        "TIMEOUT": 600,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    } if BOOK_CACHE_BACKEND == "locmem" else {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+        "KEY_PREFIX": "books",
+        "TIMEOUT": 600,
+    },
+    "verification": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+        "KEY_PREFIX": "verification",
+    } if VERIFICATION_CACHE_BACKEND == "redis" else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "verification",
+    } if VERIFICATION_CACHE_BACKEND == "locmem" else {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "verification_cache",
+    },
+}
+
+# Tests and local runs can set EMAIL_BACKEND=django.core.mail.backends.locmem.EmailBackend
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_TIMEOUT = 10
 EMAIL_HOST = 'smtp.163.com'  # 替换为您的 SMTP 服务器
 EMAIL_PORT = 465
 EMAIL_USE_SSL = True
@@ -116,6 +185,36 @@ EMAIL_HOST_USER = 'ricky__chen1@163.com'
 EMAIL_HOST_PASSWORD = 'YBsmtLUxMBPM6EFP'
 EMAIL_FROM = EMAIL_HOST_USER
 
+# Verification codes (user/verification.py): codes expire after VERIFICATION_CODE_TTL
+# seconds; each rate limit is a token bucket of (capacity, seconds to refill fully).
+VERIFICATION_CODE_TTL = 120
+VERIFICATION_RATE_LIMITS = {
+    "email": (3, 600),
+    "ip": (20, 600),
+}
+
+# User id -> username lookups (user/names.py): a per-process LRU cache and the
+# most ids one /api/user/names request may ask for.
+USERNAME_CACHE_MAX_ENTRIES = 10000
+USERNAME_CACHE_TTL = 300
+USERNAME_BATCH_MAX = 100
+
+# Password hashing
+# PASSWORD_HASHER picks the algorithm new hashes use (argon2 needs argon2-cffi).
+# The others stay listed so existing hashes still verify; they are rehashed
+# with the preferred algorithm on the user's next login (user/services.py).
+
+_PASSWORD_HASHER_CLASSES = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+    "bcrypt": "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+}
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "pbkdf2")
+PASSWORD_HASHERS = [_PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + ["django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher"]
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -147,6 +246,88 @@ USE_I18N = True
 USE_TZ = True
 
 
+# JWT: tokens are only re-signed (and returned in X-Refreshed-Token) when this close to expiry
+
+JWT_REFRESH_THRESHOLD = timedelta(hours=1)
+
+# Orders: pending orders older than this are cancelled by `manage.py expire_orders`
+# and their reserved books released
+
+ORDER_PAYMENT_TIMEOUT = timedelta(minutes=int(os.environ.get("ORDER_PAYMENT_TIMEOUT_MINUTES", 30)))
+
+
+# Keyset pagination for list endpoints (?cursor=&page_size=)
+
+API_PAGE_SIZE = 20
+
+API_MAX_PAGE_SIZE = 100
+
+# Response compression (utils/compression.py): br when the brotli package is
+# installed, otherwise gzip; bodies under COMPRESSION_MIN_SIZE bytes are sent as is
+
+COMPRESSION_MIN_SIZE = 1024
+
+COMPRESSION_GZIP_LEVEL = 6
+
+COMPRESSION_BROTLI_QUALITY = 4
+
+# /api/book/export streams the catalog in chunks of this many rows
+
+BOOK_EXPORT_CHUNK_SIZE = 2000
+
+
+# Full-text search configuration used for Book.search_vector and queries.
+# 'simple' avoids language-specific stemming, which suits mixed Chinese/English titles.
+
+BOOK_SEARCH_CONFIG = 'simple'
+
+
+# Type-ahead completions for /api/book/suggest
+
+BOOK_SUGGEST_DEFAULT_LIMIT = 8
+
+BOOK_SUGGEST_MAX_LIMIT = 20
+
+BOOK_SUGGEST_MAX_PREFIX = 100
+
+# Seconds before a worker reloads its prefix index to pick up other workers' writes
+BOOK_SUGGEST_INDEX_TTL = 300
+
+
+# Background tasks (utils/tasks.py) and cover uploads (book/covers.py)
+
+BACKGROUND_WORKERS = int(os.environ.get("BACKGROUND_WORKERS", 4))
+
+PICGO_UPLOAD_URL = os.environ.get("PICGO_UPLOAD_URL", "http://127.0.0.1:36677/upload")
+
+PICGO_UPLOAD_TIMEOUT = 10  # seconds
+
+# Covers wait here until the background upload finishes
+COVER_SPOOL_DIR = BASE_DIR / "media" / "cover_spool"
+
+# Where uploaded covers are stored: book.storage.PicGoCoverStorage (remote image host)
+# or book.storage.FileSystemCoverStorage (COVER_STORAGE_DIR, served with thumbnails)
+COVER_STORAGE_BACKEND = os.environ.get("COVER_STORAGE_BACKEND", "book.storage.PicGoCoverStorage")
+
+COVER_STORAGE_DIR = BASE_DIR / "media" / "covers"
+
+COVER_THUMBNAIL_DIR = BASE_DIR / "media" / "thumbnails"
+
+# Longest edge in pixels for /api/book/cover/<key>/<size>
+COVER_THUMBNAIL_SIZES = {"small": 160, "medium": 320, "large": 640}
+
+# Large uploads are streamed by Django into this directory; keeping it on the same
+# filesystem as COVER_SPOOL_DIR lets a cover be renamed into the spool, not copied.
+FILE_UPLOAD_TEMP_DIR = BASE_DIR / "media" / "upload_tmp"
+
+COVER_MAX_SIZE = 5 * 1024 * 1024  # bytes
+
+COVER_ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+# Allowance for the non-file fields of the publish form
+BOOK_FORM_MAX_SIZE = 64 * 1024
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
@@ -1,6 +1,15 @@
+import os
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class BookConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "book"
+
+    def ready(self):
+        from . import signals  # noqa: F401  注册模型信号
+
+        # media/ 不在版本库中；上传临时目录必须在系统检查（files.E001）之前存在
+        for path in (settings.FILE_UPLOAD_TEMP_DIR, settings.COVER_SPOOL_DIR):
+            os.makedirs(path, exist_ok=True)
@@ -0,0 +1,108 @@
+import threading
+import time
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+BOOK_CACHE_ALIAS = 'books'
+LIST_VERSION_KEY = 'book:list:v'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+class CountingLocMemCache(LocMemCache):
+    """In-process LRU cache that counts entries evicted to stay under MAX_ENTRIES"""
+
+    def _cull(self):
+        before = len(self._cache)
+        super()._cull()
+        _count('evictions', before - len(self._cache))
+
+
+def get_book_cache():
+    return caches[BOOK_CACHE_ALIAS]
+
+
+def cache_stats():
+    """Return hit/miss/eviction counters for this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+    return stats
+
+
+def _fresh_version():
+    # A missing counter (evicted or never set) restarts from the clock, never from a
+    # value an older, still-cached entry could have been stored under.
+    return time.time_ns()
+
+
+def _bump_version(key):
+    cache = get_book_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
+
+
+async def _aget_version(key):
+    cache = get_book_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _fresh_version(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def book_version_key(book_id):
+    return f'book:v:{book_id}'
+
+
+def _bump_book_versions(book_ids):
+    for book_id in book_ids:
+        if book_id is not None:
+            _bump_version(book_version_key(book_id))
+    _bump_version(LIST_VERSION_KEY)
+
+
+def bump_book_version(*book_ids):
+    """
+    Invalidate cached detail responses for the given books and every cached list page.
+
+    The bump waits for the current transaction to commit (outside one it runs at
+    once): bumping earlier would let a concurrent reader cache the pre-commit row
+    under the new version, where it would stay until the entry times out.
+    """
+    transaction.on_commit(lambda: _bump_book_versions(book_ids))
+
+
+async def acached(key, loader):
+    """Return the cached value for `key`, awaiting the coroutine function `loader` and storing its result on a miss"""
+    cache = get_book_cache()
+    value = await cache.aget(key)
+    if value is not None:
+        _count('hits')
+        return value
+
+    _count('misses')
+    value = await loader()
+    if value is not None:
+        await cache.aset(key, value)
+    return value
+
+
+async def abook_detail_key(book_id, *params):
+    return 'book:detail:{}:{}:{}'.format(
+        book_id, await _aget_version(book_version_key(book_id)), ':'.join(str(p) for p in params)
+    )
+
+
+async def abook_list_key(*params):
+    return 'book:list:{}:{}'.format(await _aget_version(LIST_VERSION_KEY), ':'.join(str(p) for p in params))
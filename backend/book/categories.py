@@ -0,0 +1,99 @@
+from collections import defaultdict
+from django.utils.timezone import now
+from .cache import bump_book_version
+from .models import Book, BookCategory, Category
+
+
+def load_category_names(book_ids):
+    """Return a {book_id: [category name, ...]} map for the given books in one query"""
+    names = defaultdict(list)
+    if not book_ids:
+        return names
+
+    rows = BookCategory.objects.filter(book_id__in=book_ids) \
+        .order_by('id') \
+        .values_list('book_id', 'category__name')
+    for book_id, category_name in rows:
+        names[book_id].append(category_name)
+    return names
+
+
+async def aload_category_names(book_ids):
+    """Async counterpart of load_category_names"""
+    names = defaultdict(list)
+    if not book_ids:
+        return names
+
+    rows = BookCategory.objects.filter(book_id__in=book_ids) \
+        .order_by('id') \
+        .values_list('book_id', 'category__name')
+    async for book_id, category_name in rows:
+        names[book_id].append(category_name)
+    return names
+
+
+def attach_categories(books):
+    """Attach a 'categories' list to each book dict, batching the lookup for the whole result set"""
+    books = list(books)
+    names = load_category_names([book['id'] for book in books])
+    for book in books:
+        book['categories'] = names.get(book['id'], [])
+    return books
+
+
+async def aattach_categories(books):
+    """Async counterpart of attach_categories"""
+    books = list(books)
+    names = await aload_category_names([book['id'] for book in books])
+    for book in books:
+        book['categories'] = names.get(book['id'], [])
+    return books
+
+
+def resolve_category_ids(names, known=None):
+    """
+    Return {name: category id} for `names`, creating missing categories.
+
+    Existing names are fetched with one IN query and missing ones inserted with
+    a single bulk INSERT that ignores conflicts (Category.name is unique, so a
+    concurrent writer creating the same name is harmless). Pass a dict as
+    `known` to reuse resolved ids across calls, e.g. during a bulk import.
+    """
+    known = {} if known is None else known
+    missing = [name for name in dict.fromkeys(names) if name not in known]
+    if missing:
+        known.update(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+        to_create = [name for name in missing if name not in known]
+        if to_create:
+            Category.objects.bulk_create([Category(name=name) for name in to_create], ignore_conflicts=True)
+            known.update(Category.objects.filter(name__in=to_create).values_list('name', 'id'))
+    return {name: known[name] for name in names}
+
+
+def set_book_categories(book_id, names, replace=False):
+    """
+    Link a book to the given category names and return the final names.
+
+    Costs a constant number of queries however many names are passed: one to
+    resolve the names (plus a bulk insert for new ones), one bulk insert for
+    the links, one update touching the book's updated_at and, with
+    replace=True, one delete for links no longer wanted.
+    """
+    names = list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+    category_ids = resolve_category_ids(names)
+
+    if replace:
+        BookCategory.objects.filter(book_id=book_id) \
+            .exclude(category_id__in=category_ids.values()) \
+            .delete()
+
+    BookCategory.objects.bulk_create(
+        [BookCategory(book_id=book_id, category_id=category_ids[name]) for name in names],
+        ignore_conflicts=True,
+    )
+
+    # bulk_create sends no signals; drop responses cached before the links existed, and move
+    # updated_at so detail ETags and cache keys (derived from it) change in every process
+    Book.objects.filter(id=book_id).update(updated_at=now())
+    bump_book_version(book_id)
+    return names
@@ -0,0 +1,55 @@
+import logging
+import os
+import shutil
+import requests
+from django.conf import settings
+from django.utils.timezone import now
+from .cache import bump_book_version
+from .models import Book
+from .storage import get_cover_storage
+
+logger = logging.getLogger(__name__)
+
+
+def spool_path(book_id, extension):
+    return os.path.join(settings.COVER_SPOOL_DIR, f'{book_id}{extension}')
+
+
+def spool_cover(book_id, cover_file):
+    """Move an uploaded cover into the spool directory, named after its book, and return the path"""
+    extension = os.path.splitext(cover_file.name)[1].lower()
+    os.makedirs(settings.COVER_SPOOL_DIR, exist_ok=True)
+    path = spool_path(book_id, extension)
+
+    if hasattr(cover_file, 'temporary_file_path'):
+        # Django already streamed the upload to disk: rename it instead of copying
+        # (FILE_UPLOAD_TEMP_DIR shares a filesystem with the spool directory).
+        shutil.move(cover_file.temporary_file_path(), path)
+    else:
+        # Small uploads are still in memory; write them out once
+        with open(path, 'wb') as spooled:
+            for chunk in cover_file.chunks():
+                spooled.write(chunk)
+    return path
+
+
+def process_cover_upload(book_id, path):
+    """Hand a spooled cover to the configured storage and record the outcome on the book"""
+    # Runs off the request thread (see utils.tasks.run_in_background)
+    try:
+        cover_key, cover_url = get_cover_storage().save(path)
+    except (requests.RequestException, OSError, ValueError) as e:
+        logger.warning("Cover upload for book %s failed: %s", book_id, e)
+        cover_key, cover_url = None, None
+
+    # updated_at moves too, so Last-Modified on the book detail reflects the new cover
+    if cover_url:
+        Book.objects.filter(id=book_id).update(
+            cover_key=cover_key, cover_url=cover_url, cover_status='ready', updated_at=now()
+        )
+    else:
+        Book.objects.filter(id=book_id).update(cover_status='failed', updated_at=now())
+    bump_book_version(book_id)
+
+    if os.path.exists(path):
+        os.remove(path)
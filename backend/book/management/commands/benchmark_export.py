@@ -0,0 +1,107 @@
+import os
+import resource
+import subprocess
+import sys
+import time
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from book.categories import attach_categories
+from book.models import Book
+from book.storage import attach_thumbnails
+from utils.response import JsonResponse
+from utils.seed import seeded_test_database
+
+
+def peak_rss_mib():
+    """High-water mark of this process's resident set size"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)  # bytes on macOS, KiB on Linux
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway catalog and compare peak RSS and time of listing every book as one "
+        "materialized JSON body versus the streaming /api/book/export endpoint; each variant "
+        "runs in its own process so neither the seeding nor the other variant sets its peak"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=100)
+        parser.add_argument(
+            '--encoding', default='identity', choices=['identity', 'gzip', 'br'],
+            help="Accept-Encoding sent to the export endpoint",
+        )
+        parser.add_argument(
+            '--handler', default='wsgi', choices=['wsgi', 'asgi'],
+            help="Serve the export through the WSGI or the ASGI request handler",
+        )
+        parser.add_argument(
+            '--variant', choices=['streaming', 'materialized'],
+            help="Measure only this variant against the current database (used for the child processes)",
+        )
+
+    def handle(self, *args, **options):
+        if options['variant']:
+            self.measure_variant(options)
+            return
+
+        sizes = {key: options[key] for key in ('books', 'users', 'categories')}
+        with seeded_test_database(orders=0, log=self.stdout.write, **sizes):
+            # ru_maxrss is a process-wide high-water mark, so each variant gets a fresh process
+            # pointed at the seeded database (settings read DB_NAME from the environment)
+            env = dict(os.environ, DB_NAME=connection.settings_dict['NAME'])
+            for variant in ('streaming', 'materialized'):
+                result = subprocess.run(
+                    [sys.executable, '-m', 'django', 'benchmark_export', '--variant', variant,
+                     '--encoding', options['encoding'], '--handler', options['handler']],
+                    cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+                )
+                if result.returncode:
+                    raise CommandError(f"{variant} run failed:\n{result.stderr}")
+                self.stdout.write(result.stdout.rstrip())
+
+    def measure_variant(self, options):
+        baseline = peak_rss_mib()
+        started = time.perf_counter()
+        if options['variant'] == 'streaming':
+            label = f"streaming export ({options['handler']})"
+            stream = self.astream if options['handler'] == 'asgi' else self.stream
+            size = stream(options['encoding'])
+        else:
+            label = 'materialized list'
+            size = self.materialize()
+        self.stdout.write(
+            f"{label:24} {size / 1024 / 1024:8.1f} MiB body  {time.perf_counter() - started:6.2f}s  "
+            f"peak RSS {peak_rss_mib():.1f} MiB (+{peak_rss_mib() - baseline:.1f} MiB over startup)"
+        )
+
+    def stream(self, encoding):
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            response = Client().get('/api/book/export', headers={'Accept-Encoding': encoding})
+        return sum(len(chunk) for chunk in response.streaming_content)
+
+    def astream(self, encoding):
+        async def consume():
+            # AsyncClient on Django 4.2 drops HTTP_* defaults instead of adding them to the ASGI
+            # scope; per-request headers do end up in scope["headers"]
+            response = await AsyncClient().get('/api/book/export', headers={'Accept-Encoding': encoding})
+            size = 0
+            async for chunk in response.streaming_content:
+                size += len(chunk)
+            return size
+
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            return async_to_sync(consume)()
+
+    def materialize(self):
+        # The pre-streaming shape: every row, its categories and the encoded body in memory at once
+        books = list(Book.objects.order_by('-created_at', '-id').values(
+            'id', 'title', 'publisher_id', 'author', 'price', 'status', 'created_at', 'cover_url', 'cover_key'
+        ))
+        return len(JsonResponse({"code": 0, "data": attach_thumbnails(attach_categories(books))}).content)
@@ -0,0 +1,87 @@
+import random
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from book.models import Book
+from book.suggest import PrefixIndex
+
+
+def _random_word(rng, length):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure /api/book/suggest lookup latency (p50/p95/p99) under concurrent load, "
+        "with a fresh index and while a stale one is being rebuilt"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100000, help="Synthetic books to index")
+        parser.add_argument('--queries', type=int, default=50000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--limit', type=int, default=8)
+        parser.add_argument('--from-db', action='store_true', help="Index the real Book table instead")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        if options['from_db']:
+            rows = list(Book.objects.values_list('id', 'title', 'author'))
+        else:
+            rows = [
+                (i, f"{_random_word(rng, rng.randint(3, 9))} {_random_word(rng, rng.randint(3, 9))}",
+                 _random_word(rng, rng.randint(4, 10)))
+                for i in range(options['books'])
+            ]
+
+        index = PrefixIndex()
+        started = time.perf_counter()
+        index.build(rows)
+        build_seconds = time.perf_counter() - started
+
+        titles = [row[1] for row in rows] or ['a']
+        prefixes = [
+            titles[rng.randrange(len(titles))][:rng.randint(1, 4)]
+            for _ in range(options['queries'])
+        ]
+        limit = options['limit']
+
+        rebuilds = []
+
+        def load_rows():
+            rebuilds.append(1)
+            return rows
+
+        def lookup(prefix):
+            # What suggest_books_view does per request: the staleness check, then the lookup
+            begin = time.perf_counter()
+            index.refresh_if_stale(load_rows)
+            index.suggest(prefix, limit)
+            return time.perf_counter() - begin
+
+        self.stdout.write(f"Indexed {len(rows)} books in {build_seconds:.2f}s")
+        self.run_lookups("fresh index", lookup, prefixes, options['threads'])
+
+        # Expire the index: one background rebuild should start while lookups keep being served
+        index.built_at -= settings.BOOK_SUGGEST_INDEX_TTL + 1
+        self.run_lookups("stale index", lookup, prefixes, options['threads'])
+        self.stdout.write(f"rebuilds started while stale: {len(rebuilds)}")
+
+    def run_lookups(self, label, lookup, prefixes, threads):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = sorted(pool.map(lookup, prefixes, chunksize=256))
+        elapsed = time.perf_counter() - started
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e6
+
+        self.stdout.write(
+            f"{label}: {len(latencies)} lookups on {threads} threads: "
+            f"{len(latencies) / elapsed:.0f} ops/s, "
+            f"p50 {percentile(0.50):.1f}us, p95 {percentile(0.95):.1f}us, p99 {percentile(0.99):.1f}us"
+        )
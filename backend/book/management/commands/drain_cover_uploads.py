@@ -0,0 +1,27 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from book.covers import process_cover_upload
+from book.models import Book
+
+
+class Command(BaseCommand):
+    help = "Upload covers still waiting in the spool directory (e.g. after a worker restart)"
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(settings.COVER_SPOOL_DIR):
+            self.stdout.write("Spool directory is empty")
+            return
+
+        spooled = {}
+        for name in os.listdir(settings.COVER_SPOOL_DIR):
+            book_id, _ = os.path.splitext(name)
+            if book_id.isdigit():
+                spooled[int(book_id)] = os.path.join(settings.COVER_SPOOL_DIR, name)
+
+        pending = Book.objects.filter(id__in=spooled, cover_status='pending').values_list('id', flat=True)
+        drained = 0
+        for book_id in pending:
+            process_cover_upload(book_id, spooled[book_id])
+            drained += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {drained} pending cover uploads"))
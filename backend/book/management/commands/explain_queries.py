@@ -0,0 +1,87 @@
+from contextlib import nullcontext
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.utils.timezone import now
+from book.models import Book, BookCategory
+from book.search import search_books
+from order.models import Order
+from utils.seed import seeded_test_database
+
+BOOK_LIST_FIELDS = ('id', 'title', 'publisher_id', 'author', 'price', 'status', 'created_at', 'cover_url')
+ORDER_FIELDS = ('id', 'buyer_id', 'seller_id', 'book_id', 'price', 'status', 'created_at', 'updated_at')
+
+
+class Command(BaseCommand):
+    help = "Print EXPLAIN (ANALYZE on Postgres) for the query behind each API endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true',
+                            help="Run against a throwaway seeded test database instead of the configured one")
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--books', type=int, default=50000)
+        parser.add_argument('--categories', type=int, default=200)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            context = seeded_test_database(
+                log=self.stdout.write,
+                users=options['users'],
+                books=options['books'],
+                categories=options['categories'],
+                orders=options['orders'],
+            )
+        else:
+            context = nullcontext()
+
+        with context:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute('ANALYZE')
+            for name, queryset in self.endpoint_queries(options['page_size']):
+                self.explain(name, queryset)
+
+    def endpoint_queries(self, page_size):
+        """Yield (endpoint, queryset) pairs shaped the way the views build them"""
+        newest = Book.objects.order_by('-created_at', '-id').values('id', 'created_at', 'publisher_id').first()
+        if newest is None:
+            self.stderr.write("No books found; use --seed to explain against a seeded dataset")
+            return
+        publisher_id = newest['publisher_id']
+        page = Book.objects.values(*BOOK_LIST_FIELDS).order_by('-created_at', '-id')
+        after_newest = Q(created_at__lte=newest['created_at']) & (
+            Q(created_at__lt=newest['created_at']) | Q(created_at=newest['created_at'], id__lt=newest['id'])
+        )
+        page_ids = list(page.values_list('id', flat=True)[:page_size])
+        buyer_id = Order.objects.values_list('buyer_id', flat=True).first()
+
+        yield 'book-list (first page)', page[:page_size + 1]
+        yield 'book-list (cursor page)', page.filter(after_newest)[:page_size + 1]
+        yield 'book-list (categories)', BookCategory.objects.filter(book_id__in=page_ids) \
+            .order_by('id').values_list('book_id', 'category__name')
+        yield 'book-detail', Book.objects.filter(id=newest['id']).values(*BOOK_LIST_FIELDS, 'description')
+        yield 'book-search', search_books('python').values(*BOOK_LIST_FIELDS, 'rank') \
+            .order_by('-rank', '-id')[:page_size + 1]
+        yield 'book-published', Book.objects.filter(publisher_id=publisher_id) \
+            .values(*BOOK_LIST_FIELDS).order_by('-created_at', '-id')[:page_size + 1]
+        yield 'book-sold', Book.objects.filter(publisher_id=publisher_id, status='sold') \
+            .values(*BOOK_LIST_FIELDS).order_by('-created_at', '-id')[:page_size + 1]
+        yield 'order-list', Order.objects.filter(buyer_id=buyer_id) \
+            .values(*ORDER_FIELDS).order_by('-created_at', '-id')[:page_size + 1]
+        yield 'order-seller-pending', Order.objects.filter(seller_id=publisher_id, status='pending')
+        yield 'order-pending-expired', Order.objects.filter(
+            status='pending', created_at__lt=now() - timedelta(minutes=30)
+        ).values('id')[:1000]
+
+    def explain(self, name, queryset):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}"))
+        self.stdout.write(str(queryset.query))
+        if connection.vendor == 'postgresql':
+            plan = queryset.explain(analyze=True, buffers=True)
+        else:
+            plan = queryset.explain()
+        self.stdout.write(plan)
+        self.stdout.write("")
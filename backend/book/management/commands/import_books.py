@@ -0,0 +1,147 @@
+import csv
+import json
+import time
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from book.cache import bump_book_version
+from book.categories import resolve_category_ids
+from book.models import Book, BookCategory, Category
+from book.search import refresh_search_vector
+from user.models import User
+
+BOOK_FIELDS = {field.name: field for field in Book._meta.get_fields() if field.concrete}
+CATEGORY_NAME_FIELD = Category._meta.get_field('name')
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import books from a CSV or JSONL file. Columns/keys: title, author, price, "
+        "description, categories, publisher (username), status, cover_url"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--publisher', help="Username used for rows without a publisher")
+        parser.add_argument('--category-separator', default='|', help="Separator of CSV category lists")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        self.batch_size = options['batch_size']
+        self.separator = options['category_separator']
+        self.category_ids = {}
+        self.publisher_ids = {}
+        self.default_publisher = options['publisher']
+        if self.default_publisher:
+            self.resolve_publishers([self.default_publisher])
+
+        self.imported = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+
+        with open(path, newline='', encoding='utf-8') as source:
+            rows = csv.DictReader(source) if file_format == 'csv' else self.read_jsonl(source)
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    batch = []
+            if batch:
+                self.import_batch(batch)
+
+        # bulk_create bypasses model signals, so invalidate cached list pages once here
+        bump_book_version()
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.imported} books in {elapsed:.1f}s "
+            f"({self.imported / elapsed if elapsed else 0:.0f} books/s), skipped {self.skipped} invalid rows"
+        ))
+
+    def resolve_publishers(self, usernames):
+        missing = [name for name in set(usernames) if name not in self.publisher_ids]
+        if missing:
+            self.publisher_ids.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+        if self.default_publisher and self.default_publisher not in self.publisher_ids:
+            raise CommandError(f"Publisher '{self.default_publisher}' does not exist")
+
+    def read_jsonl(self, source):
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            # Malformed lines are passed on as None and counted as skipped
+            yield row if isinstance(row, dict) else None
+
+    def parse_categories(self, value):
+        if not value:
+            return []
+        if isinstance(value, str):
+            value = value.split(self.separator)
+        if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+            raise ValidationError("categories must be a list of names")
+        names = [name.strip() for name in value if name.strip()]
+        for name in names:
+            CATEGORY_NAME_FIELD.clean(name, None)
+        return names
+
+    def clean_row(self, row):
+        """
+        Return the Book field values and category names of `row`, validated
+        against the model fields (lengths, price digits, status choices), so a
+        bad row is skipped here instead of failing a whole batch in the database.
+        """
+        fields = {name: BOOK_FIELDS[name].clean(row.get(name), None) for name in ('title', 'author')}
+        fields['price'] = BOOK_FIELDS['price'].clean(str(row.get('price')), None)  # rejects NaN and Infinity
+        if fields['price'] <= 0:
+            raise ValidationError("price must be positive")
+        fields['status'] = BOOK_FIELDS['status'].clean(row.get('status') or 'available', None)
+        fields['cover_url'] = BOOK_FIELDS['cover_url'].clean(row.get('cover_url') or None, None)
+        fields['description'] = str(row.get('description') or '')
+        return fields, self.parse_categories(row.get('categories'))
+
+    def import_batch(self, rows):
+        batch_size = len(rows)
+        rows = [row for row in rows if row is not None]
+        self.skipped += batch_size - len(rows)
+        self.resolve_publishers([row['publisher'] for row in rows if isinstance(row.get('publisher'), str)])
+
+        books = []
+        book_categories = []
+        for row in rows:
+            publisher = row.get('publisher') or self.default_publisher
+            publisher_id = self.publisher_ids.get(publisher) if isinstance(publisher, str) else None
+            try:
+                fields, categories = self.clean_row(row)
+            except ValidationError:
+                fields = None
+            if fields is None or not publisher_id:
+                self.skipped += 1
+                continue
+
+            books.append(Book(publisher_id=publisher_id, **fields))
+            book_categories.append(categories)
+
+        with transaction.atomic():
+            created = Book.objects.bulk_create(books)
+            category_ids = resolve_category_ids(
+                [name for names in book_categories for name in names], known=self.category_ids
+            )
+            BookCategory.objects.bulk_create(
+                [BookCategory(book_id=book.id, category_id=category_ids[name])
+                 for book, names in zip(created, book_categories)
+                 for name in dict.fromkeys(names)],
+                ignore_conflicts=True,
+            )
+            refresh_search_vector([book.id for book in created])
+
+        self.imported += len(created)
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(f"Imported {self.imported} books ({self.imported / elapsed:.0f} books/s)")
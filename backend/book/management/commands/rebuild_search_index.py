@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from book.models import Book
+from book.search import refresh_search_vector
+
+
+class Command(BaseCommand):
+    help = "Recompute Book.search_vector for every book (run once after adding the column)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(
+                Book.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            refresh_search_vector(ids)
+            total += len(ids)
+            last_id = ids[-1]
+            self.stdout.write(f"Indexed {total} books")
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt for {total} books"))
@@ -1,9 +1,20 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from user.models import User
 
+class SearchVectorIndex(GinIndex):
+    """GIN index on Postgres; falls back to a plain index elsewhere so SQLite test databases still migrate"""
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return models.Index.create_sql(self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
 class Book(models.Model):
     STATUS_CHOICES = [
         ('available', '在售'),
+        ('reserved', '已预订'),  # 有待支付订单
         ('sold', '已售出'),
     ]
 
@@ -16,15 +27,49 @@ class Book(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    COVER_STATUS_CHOICES = [
+        ('none', '无封面'),
+        ('pending', '上传中'),
+        ('ready', '已上传'),
+        ('failed', '上传失败'),
+    ]
+
     cover_url = models.URLField(blank=True, null=True)  # 新增封面字段
+    cover_key = models.CharField(max_length=80, blank=True, null=True)  # 本地存储的封面（内容哈希）
+    cover_status = models.CharField(max_length=10, choices=COVER_STATUS_CHOICES, default='none')
+    # 全文检索向量（标题、作者、简介、分类名），由 book.search.refresh_search_vector 维护
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            SearchVectorIndex(fields=['search_vector'], name='book_search_vector_idx'),
+            # /api/book/list：按 (created_at, id) 倒序的游标分页
+            models.Index(fields=['-created_at', '-id'], name='book_created_idx'),
+            # /api/book/published：当前用户发布的书籍
+            models.Index(fields=['publisher', '-created_at', '-id'], name='book_publisher_created_idx'),
+            # /api/book/sold：当前用户某状态的书籍
+            models.Index(fields=['publisher', 'status', '-created_at', '-id'], name='book_publisher_status_idx'),
+            # 在售书籍（部分索引，只包含 status='available' 的行）
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(status='available'),
+                name='book_available_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 class Category(models.Model):
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, unique=True)
 
 class BookCategory(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # 同一本书不能重复关联同一个类别；唯一索引同时覆盖 (book_id, category_id) 查询
+            models.UniqueConstraint(fields=['book', 'category'], name='book_category_unique'),
+        ]
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, Exists, F, FloatField, OuterRef, Q, Subquery, TextField, Value, When
+from django.db.models.functions import Cast, Coalesce
+from .models import Book, BookCategory
+
+
+def _uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def refresh_search_vector(book_ids):
+    """Recompute the stored search vector for the given books in a single UPDATE"""
+    if not book_ids or not _uses_postgres():
+        return
+
+    config = settings.BOOK_SEARCH_CONFIG
+    category_names = BookCategory.objects.filter(book_id=OuterRef('pk')) \
+        .values('book_id') \
+        .annotate(names=StringAgg('category__name', delimiter=' ')) \
+        .values('names')
+
+    Book.objects.filter(id__in=book_ids).update(
+        search_vector=(
+            SearchVector('title', weight='A', config=config)
+            + SearchVector('author', weight='B', config=config)
+            # StringAgg and description are text; without output_field Coalesce sees mixed types
+            + SearchVector(
+                Coalesce(Subquery(category_names), Value(''), output_field=TextField()), weight='B', config=config
+            )
+            + SearchVector(Coalesce('description', Value(''), output_field=TextField()), weight='C', config=config)
+        )
+    )
+
+
+def search_books(query):
+    """
+    Return a queryset of books matching `query`, annotated with a float `rank`.
+
+    On Postgres this is a GIN-indexed tsvector match ranked by ts_rank. Other
+    backends (SQLite in tests) use an equivalent icontains match with a fixed
+    per-field weighting, so callers can order and paginate on (rank, id) either way.
+    """
+    if _uses_postgres():
+        search_query = SearchQuery(query, search_type='websearch', config=settings.BOOK_SEARCH_CONFIG)
+        return Book.objects.filter(search_vector=search_query).annotate(
+            # ts_rank returns a real; widen it so the value survives a cursor round-trip exactly
+            rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+        )
+
+    category_match = BookCategory.objects.filter(
+        book_id=OuterRef('pk'), category__name__icontains=query
+    )
+    return Book.objects.annotate(category_match=Exists(category_match)).filter(
+        Q(title__icontains=query)
+        | Q(author__icontains=query)
+        | Q(description__icontains=query)
+        | Q(category_match=True)
+    ).annotate(
+        rank=(
+            Case(When(title__icontains=query, then=Value(1.0)), default=Value(0.0))
+            + Case(When(author__icontains=query, then=Value(0.4)), default=Value(0.0))
+            + Case(When(category_match=True, then=Value(0.4)), default=Value(0.0))
+            + Case(When(description__icontains=query, then=Value(0.2)), default=Value(0.0))
+        )
+    )
@@ -0,0 +1,40 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .models import Book, BookCategory
+from .cache import bump_book_version
+from .suggest import suggest_index
+
+
+@receiver(post_save, sender=Book)
+def index_book_for_suggest(sender, instance, **kwargs):
+    # Only maintain an index that has been built; the first lookup loads it from the DB
+    if suggest_index.built_at is not None:
+        suggest_index.add_book(instance.id, instance.title, instance.author)
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book_for_suggest(sender, instance, **kwargs):
+    suggest_index.remove_book(instance.id)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_cache(sender, instance, **kwargs):
+    bump_book_version(instance.id)
+
+
+@receiver(post_save, sender=BookCategory)
+@receiver(post_delete, sender=BookCategory)
+def invalidate_book_category_cache(sender, instance, **kwargs):
+    bump_book_version(instance.book_id)
+
+
+@receiver(m2m_changed, sender=Book.categories.through)
+def invalidate_book_categories_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    # book.categories.set()/add()/remove() bulk-write the through table without post_save
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump_book_version(instance.pk)
+    else:
+        bump_book_version(*(pk_set or ()))
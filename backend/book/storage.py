@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import requests
+from django.conf import settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it thumbnails fall back to the original
+    Image = None
+
+# Covers in local storage are addressed by content hash: "<sha256 hex><extension>"
+COVER_KEY_RE = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]{1,5}$')
+
+
+class CoverStorage:
+    """Where uploaded covers end up; subclasses are selected with COVER_STORAGE_BACKEND"""
+
+    def save(self, path):
+        """Store the file at `path` (consuming it) and return (cover_key, cover_url)"""
+        raise NotImplementedError
+
+    def path(self, key):
+        """Return the local filesystem path of a stored cover, or None if covers are remote"""
+        return None
+
+
+class PicGoCoverStorage(CoverStorage):
+    """Upload covers to a PicGo image host; only the returned URL is kept"""
+
+    def save(self, path):
+        # Prepare JSON request body
+        data = json.dumps({'list': [path]})
+        headers = {'Content-Type': 'application/json'}
+
+        # Send POST request to PicGo; never wait on a stalled image host forever
+        response = requests.post(
+            settings.PICGO_UPLOAD_URL, data=data, headers=headers, timeout=settings.PICGO_UPLOAD_TIMEOUT
+        )
+
+        cover_url = None
+        if response.status_code == 200:
+            result = response.json()
+            if result.get('success'):
+                cover_url = result.get('result')[0]  # The uploaded image URL
+        os.remove(path)
+        return None, cover_url
+
+
+class FileSystemCoverStorage(CoverStorage):
+    """Keep covers under COVER_STORAGE_DIR, deduplicated by content hash"""
+
+    def save(self, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as cover:
+            for chunk in iter(lambda: cover.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+        key = digest.hexdigest() + os.path.splitext(path)[1].lower()
+        destination = self.path(key)
+        if os.path.exists(destination):
+            os.remove(path)  # Same image already stored
+        else:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.move(path, destination)
+        return key, thumbnail_url(key, 'original')
+
+    def path(self, key):
+        return os.path.join(settings.COVER_STORAGE_DIR, key[:2], key)
+
+
+def get_cover_storage():
+    return import_string(settings.COVER_STORAGE_BACKEND)()
+
+
+def thumbnail_url(key, size):
+    return reverse('book-cover', args=[key, size])
+
+
+def attach_thumbnails(books, size='small'):
+    """Add 'cover_thumb_url' to book dicts carrying 'cover_key' and 'cover_url'"""
+    for book in books:
+        key = book.pop('cover_key', None)
+        book['cover_thumb_url'] = thumbnail_url(key, size) if key else book.get('cover_url')
+    return books
+
+
+def get_thumbnail(key, size):
+    """
+    Return the path of `key` resized to `size`, generating and caching it on disk
+    on first use. Returns None when the cover is not stored locally.
+    """
+    original = get_cover_storage().path(key)
+    if original is None or not os.path.exists(original):
+        return None
+    if size == 'original' or Image is None:
+        return original
+
+    extension = '.png' if key.endswith('.png') else '.jpg'
+    thumbnail = os.path.join(settings.COVER_THUMBNAIL_DIR, size, key[:2], key[:64] + extension)
+    if os.path.exists(thumbnail):
+        return thumbnail
+
+    dimension = settings.COVER_THUMBNAIL_SIZES[size]
+    os.makedirs(os.path.dirname(thumbnail), exist_ok=True)
+    with Image.open(original) as image:
+        image.thumbnail((dimension, dimension))
+        if extension == '.jpg' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        # Write next to the target and rename, so concurrent requests never see a partial file
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(thumbnail), suffix=extension)
+        with os.fdopen(fd, 'wb') as output:
+            image.save(output, format='PNG' if extension == '.png' else 'JPEG', quality=85)
+    os.replace(temporary, thumbnail)
+    return thumbnail
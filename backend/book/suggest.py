@@ -0,0 +1,146 @@
+import bisect
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+from .models import Book
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixIndex:
+    """
+    In-memory prefix index over book titles and authors.
+
+    Completions are kept in a sorted list of (normalized text, type, display
+    text) entries, so a lookup is one bisect plus a scan of at most `limit`
+    matches. Several books can share a completion (e.g. the same author); a
+    reference count decides when an entry leaves the index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._entries = []
+        self._refcounts = {}
+        self._by_book = {}
+        self.built_at = None
+
+    @staticmethod
+    def _normalize(text):
+        return ' '.join(text.split()).lower()
+
+    def _entries_for(self, title, author):
+        entries = set()
+        for kind, text in (('title', title), ('author', author)):
+            if text and text.strip():
+                entries.add((self._normalize(text), kind, text.strip()))
+        return entries
+
+    def _add_entry(self, entry):
+        count = self._refcounts.get(entry, 0)
+        if count == 0:
+            bisect.insort(self._entries, entry)
+        self._refcounts[entry] = count + 1
+
+    def _remove_entry(self, entry):
+        count = self._refcounts.get(entry, 0) - 1
+        if count > 0:
+            self._refcounts[entry] = count
+            return
+        self._refcounts.pop(entry, None)
+        position = bisect.bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def build(self, rows):
+        """Replace the index contents with (book_id, title, author) rows"""
+        by_book = {}
+        refcounts = {}
+        for book_id, title, author in rows:
+            entries = self._entries_for(title, author)
+            by_book[book_id] = entries
+            for entry in entries:
+                refcounts[entry] = refcounts.get(entry, 0) + 1
+        with self._lock:
+            self._by_book = by_book
+            self._refcounts = refcounts
+            self._entries = sorted(refcounts)
+            self.built_at = time.monotonic()
+
+    def add_book(self, book_id, title, author):
+        """Index a created or updated book, replacing its previous completions"""
+        entries = self._entries_for(title, author)
+        with self._lock:
+            for entry in self._by_book.pop(book_id, ()):
+                self._remove_entry(entry)
+            for entry in entries:
+                self._add_entry(entry)
+            self._by_book[book_id] = entries
+
+    def remove_book(self, book_id):
+        with self._lock:
+            for entry in self._by_book.pop(book_id, ()):
+                self._remove_entry(entry)
+
+    def suggest(self, prefix, limit):
+        """Return up to `limit` completions starting with `prefix`, in lexical order"""
+        prefix = self._normalize(prefix)
+        results = []
+        with self._lock:
+            position = bisect.bisect_left(self._entries, (prefix,))
+            while position < len(self._entries) and len(results) < limit:
+                normalized, kind, text = self._entries[position]
+                if not normalized.startswith(prefix):
+                    break
+                results.append({"text": text, "type": kind})
+                position += 1
+        return results
+
+    def is_stale(self):
+        if self.built_at is None:
+            return True
+        return time.monotonic() - self.built_at > settings.BOOK_SUGGEST_INDEX_TTL
+
+    def refresh_if_stale(self, load_rows):
+        """
+        Rebuild from load_rows() when stale, with at most one rebuild running at a time.
+
+        Only the very first build blocks callers, since there is nothing to serve yet.
+        Later rebuilds run on a background thread while every caller, including
+        the one that started it, keeps using the current entries.
+        """
+        if not self.is_stale():
+            return
+        if self.built_at is None:
+            with self._refresh_lock:
+                if self.built_at is None:
+                    self.build(load_rows())
+            return
+        if self._refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self._rebuild, args=(load_rows,), name='suggest-rebuild', daemon=True).start()
+
+    def _rebuild(self, load_rows):
+        try:
+            self.build(load_rows())
+        except Exception:
+            logger.exception("Rebuilding the suggest index failed")
+        finally:
+            self._refresh_lock.release()
+            connections.close_all()  # this thread's connections; it is about to exit
+
+
+suggest_index = PrefixIndex()
+
+
+def _load_book_rows():
+    return Book.objects.values_list('id', 'title', 'author').iterator(chunk_size=5000)
+
+
+def get_suggest_index():
+    """Return the process-wide index, rebuilding it when missing or older than BOOK_SUGGEST_INDEX_TTL"""
+    # Saves in this process update the index directly; the TTL rebuild picks up
+    # writes made by other workers and by bulk imports that bypass signals.
+    suggest_index.refresh_if_stale(_load_book_rows)
+    return suggest_index
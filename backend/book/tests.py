@@ -1,3 +1,245 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import threading
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import skipUnless
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from user.models import User
+from utils import tasks
+from utils.jwt import generate_jwt_token
+from utils.pagination import encode_cursor
+from .cache import get_book_cache
+from .covers import spool_path
+from .models import Book, BookCategory, Category
+from .search import refresh_search_vector
 
-# Create your tests here.
+
+class BookListingQueryCountTests(TestCase):
+    """Listing endpoints cost the same number of queries however many books a page holds"""
+
+    BOOKS = 10
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='query_count_user', password='query-count-123')
+        self.categories = [Category.objects.create(name=f'query_count_category_{i}') for i in range(3)]
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_jwt_token(self.user)}'}
+
+    def add_books(self, count, status='available'):
+        books = Book.objects.bulk_create([
+            Book(
+                title=f'Querycount book {i}',
+                author='Querycount author',
+                publisher=self.user,
+                price=Decimal('9.90'),
+                status=status,
+            )
+            for i in range(count)
+        ])
+        BookCategory.objects.bulk_create([
+            BookCategory(book=book, category=category)
+            for book in books
+            for category in self.categories[:2]
+        ])
+        refresh_search_vector([book.id for book in books])
+
+    def assert_constant_queries(self, path, queries, status='available', params=None, **extra):
+        params = {'page_size': self.BOOKS * 2, **(params or {})}
+        for total in (self.BOOKS, self.BOOKS * 2):
+            self.add_books(self.BOOKS, status=status)
+            # Version bumps wait for a commit that never happens inside TestCase; start from a cold cache
+            get_book_cache().clear()
+            with self.assertNumQueries(queries):
+                response = self.client.get(path, params, **extra)
+
+            body = response.json()
+            self.assertEqual(body['code'], 0)
+            self.assertEqual(len(body['data']), total)
+            for book in body['data']:
+                self.assertEqual(len(book['categories']), 2)
+
+    def test_book_list(self):
+        # The freshness probe, the page, then one batched category lookup
+        self.assert_constant_queries('/api/book/list', 3)
+
+    def test_book_list_with_publisher(self):
+        self.assert_constant_queries('/api/book/list', 3, params={'with_publisher': '1'})
+
+    def test_published_books(self):
+        self.assert_constant_queries('/api/book/published', 2, **self.auth)
+
+    def test_sold_books(self):
+        self.assert_constant_queries('/api/book/sold', 2, status='sold', **self.auth)
+
+    def test_search_books(self):
+        self.assert_constant_queries('/api/book/search', 2, params={'query': 'Querycount'})
+
+
+
+
+class InvalidCursorTests(TestCase):
+    """A malformed ?cursor= is reported as an invalid cursor, never a server error"""
+
+    def assert_invalid(self, path, payload, **params):
+        response = self.client.get(path, {'cursor': encode_cursor(payload), **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'code': 1, 'msg': 'Invalid cursor'})
+
+    def test_book_list(self):
+        for payload in ([123, 1], [None, None], ['not a date', 1], ['2024-01-01T00:00:00+00:00', 'x'], [1]):
+            self.assert_invalid('/api/book/list', payload)
+
+    def test_search_rank(self):
+        for payload in (['high', 1], [None, 1], [True, 1], [0.5, None]):
+            self.assert_invalid('/api/book/search', payload, query='python')
+
+@skipUnless(connection.vendor == 'postgresql', "the tsvector search path only runs on Postgres")
+class PostgresSearchTests(TestCase):
+    """Published books are indexed into search_vector and found by /api/book/search"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='search_user', password='search-user-123')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_jwt_token(user)}'}
+
+    def publish(self, **fields):
+        data = {'title': 'Relational databases', 'author': 'Ada Lovelace', 'price': '30.00', **fields}
+        body = self.client.post('/api/book/publish', data, **self.auth).json()
+        self.assertEqual(body['code'], 0)
+        return body['data']['id']
+
+    def search(self, query):
+        body = self.client.get('/api/book/search', {'query': query}).json()
+        self.assertEqual(body['code'], 0)
+        return [book['id'] for book in body['data']]
+
+    def test_published_book_is_indexed(self):
+        book_id = self.publish(categories=['Mathematics'], description='Normal forms explained')
+        self.assertIsNotNone(Book.objects.get(id=book_id).search_vector)
+
+        for query in ('relational', 'lovelace', 'mathematics', 'normal forms'):
+            self.assertEqual(self.search(query), [book_id], query)
+
+    def test_book_without_categories_or_description_is_indexed(self):
+        book_id = self.publish()
+        self.assertEqual(self.search('databases'), [book_id])
+
+class PicGoStubHandler(BaseHTTPRequestHandler):
+    """Answers PicGo's /upload like the real server once the test releases it"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.uploads.extend(json.loads(body)['list'])
+        self.server.release.wait(10)
+
+        if self.server.status == 200:
+            payload = json.dumps({'success': True, 'result': ['https://img.example.com/cover.png']}).encode()
+        else:
+            payload = b'{"success": false}'
+        try:
+            self.send_response(self.server.status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except OSError:
+            pass  # The client already gave up (timeout case)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CoverUploadTests(TransactionTestCase):
+    """
+    A published cover is uploaded to PicGo in the background after the book commits.
+
+    TransactionTestCase rather than TestCase: the upload runs on a worker thread
+    with its own connection, which only sees committed rows.
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), PicGoStubHandler)
+        self.server.daemon_threads = True
+        self.server.status = 200
+        self.server.uploads = []
+        self.server.release = threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(self.server.release.set)
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        overrides = override_settings(
+            COVER_STORAGE_BACKEND='book.storage.PicGoCoverStorage',
+            PICGO_UPLOAD_URL=f'http://127.0.0.1:{self.server.server_port}/upload',
+            PICGO_UPLOAD_TIMEOUT=1,
+            COVER_SPOOL_DIR=os.path.join(media, 'cover_spool'),
+            FILE_UPLOAD_TEMP_DIR=os.path.join(media, 'upload_tmp'),
+            BACKGROUND_WORKERS=1,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        # A single worker runs tasks in order, so queueing behind the upload waits for it
+        tasks._executor = None
+        self.addCleanup(self.stop_background_tasks)
+
+        user = User.objects.create_user(username='cover_upload_user', password='cover-upload-123')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_jwt_token(user)}'}
+
+    def wait_for_background_tasks(self):
+        # Runs on the worker thread: drains the queue and closes that thread's connection
+        tasks._get_executor().submit(connections.close_all).result(timeout=10)
+
+    def stop_background_tasks(self):
+        self.wait_for_background_tasks()
+        tasks._get_executor().shutdown()
+        tasks._executor = None
+
+    def publish(self):
+        cover = SimpleUploadedFile('cover.png', b'\x89PNG\r\n\x1a\nstub', content_type='image/png')
+        response = self.client.post(
+            '/api/book/publish',
+            {'title': 'Cover book', 'author': 'Cover author', 'price': '12.50', 'cover': cover},
+            **self.auth,
+        )
+        body = response.json()
+        self.assertEqual(body['code'], 0)
+        self.assertEqual(body['data']['cover_status'], 'pending')
+
+        # The stub holds the upload until released, so the book is still pending
+        book_id = body['data']['id']
+        self.assertEqual(Book.objects.get(id=book_id).cover_status, 'pending')
+        return book_id
+
+    def assert_upload_finished(self, book_id, cover_status):
+        self.wait_for_background_tasks()
+        book = Book.objects.get(id=book_id)
+        self.assertEqual(book.cover_status, cover_status)
+        path = spool_path(book_id, '.png')
+        self.assertEqual(self.server.uploads, [path])
+        self.assertFalse(os.path.exists(path))
+        return book
+
+    def test_upload_succeeds(self):
+        book_id = self.publish()
+        self.server.release.set()
+        book = self.assert_upload_finished(book_id, 'ready')
+        self.assertEqual(book.cover_url, 'https://img.example.com/cover.png')
+
+    def test_server_error_marks_cover_failed(self):
+        self.server.status = 500
+        book_id = self.publish()
+        self.server.release.set()
+        book = self.assert_upload_finished(book_id, 'failed')
+        self.assertIsNone(book.cover_url)
+
+    def test_timeout_marks_cover_failed(self):
+        # Never released: the upload gives up after PICGO_UPLOAD_TIMEOUT
+        book_id = self.publish()
+        book = self.assert_upload_finished(book_id, 'failed')
+        self.assertIsNone(book.cover_url)
@@ -0,0 +1,39 @@
+import os
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+
+class CoverUploadHandler(FileUploadHandler):
+    """
+    Enforce cover type and size limits while the multipart body is parsed.
+
+    Runs ahead of Django's own handlers, so a rejected cover is discarded
+    chunk by chunk instead of being buffered or spooled first. The reason is
+    left on request.cover_error for the view to report.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.received = 0
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.received = 0
+        if field_name != 'cover':
+            return
+
+        extension = os.path.splitext(file_name)[1].lower()
+        if extension not in settings.COVER_ALLOWED_EXTENSIONS or not content_type.startswith('image/'):
+            self.request.cover_error = "Unsupported cover type"
+            raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.field_name == 'cover':
+            self.received += len(raw_data)
+            if self.received > settings.COVER_MAX_SIZE:
+                self.request.cover_error = "Cover image is too large"
+                raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
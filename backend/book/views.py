@@ -1,18 +1,26 @@
-import requests
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponseNotModified
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.db.models import Count, F, Max
 from django.forms import ModelForm
 from django.utils.timezone import now
-from .models import Book, Category, BookCategory
-from rest_framework_simplejwt.tokens import AccessToken
-from utils.jwt import verify_and_refresh_token
-from django.db.models import Q
-import json
+from .models import Book
+from .categories import attach_categories, aattach_categories, load_category_names, set_book_categories
+from .search import search_books, refresh_search_vector
+from .suggest import get_suggest_index
+from .cache import acached, cache_stats, abook_detail_key, abook_list_key
+from .covers import spool_cover, process_cover_upload
+from .uploads import CoverUploadHandler
+from .storage import COVER_KEY_RE, attach_thumbnails, get_thumbnail
+from utils.conditional import make_etag, not_modified, set_validators
+from utils.jwt import jwt_required
+from utils.response import JsonResponse, StreamingJsonResponse
+from utils.tasks import run_in_background
+from utils.pagination import keyset_paginate, akeyset_paginate, get_page_size, InvalidPageRequest
+import mimetypes
 import os
-import tempfile
-
-PICGO_UPLOAD_URL = "http://127.0.0.1:36677/upload"
 
 # Define Book creation form
 class CreateBookForm(ModelForm):
@@ -21,16 +29,18 @@ class CreateBookForm(ModelForm):
         fields = ['title', 'author', 'description', 'price']
 
 @csrf_exempt
+@jwt_required
 def create_book_view(request):
     """Handle book creation via POST request"""
     if request.method == 'POST':
-        # Validate and refresh the token
-        try:
-            token = verify_and_refresh_token(request)
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']  # Extract user ID from the token
-        except Exception as e:
-            return JsonResponse({"code": 1, "msg": f"Token validation failed: {str(e)}"})
+        user_id = request.user_id  # Extract user ID from the token
+
+        # Refuse oversized bodies before reading them, and check the cover while it streams in
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if content_length > settings.COVER_MAX_SIZE + settings.BOOK_FORM_MAX_SIZE:
+            return JsonResponse({"code": 1, "msg": "Request body is too large"})
+        os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        request.upload_handlers.insert(0, CoverUploadHandler(request))
 
         # Extract data from the POST request
         title = request.POST.get('title')
@@ -43,6 +53,9 @@ def create_book_view(request):
         if not title or not author or not price:
             return JsonResponse({"code": 1, "msg": "Missing required parameters"})
 
+        if getattr(request, 'cover_error', None):
+            return JsonResponse({"code": 1, "msg": request.cover_error})
+
         # Prepare book data for creation
         book_data = {
             'publisher': user_id,
@@ -60,21 +73,21 @@ def create_book_view(request):
             book.publisher_id = user_id
             book.created_at = now()  # Set the creation timestamp
 
-            # Upload cover image to PicGo server
-            cover_url = None
-            if cover:
-                cover_url = upload_image_to_picgo(cover)
-
-            if cover_url:
-                book.cover_url = cover_url  # Save the PicGo URL
+            # The cover is uploaded to PicGo in the background once the book is committed
+            extension = os.path.splitext(cover.name)[1] if cover else ''
+            if extension:
+                book.cover_status = 'pending'
 
             book.save()  # Save the book instance to the database
 
-            # Handle categories
-            if categories:
-                for category_name in categories:
-                    category, _ = Category.objects.get_or_create(name=category_name)
-                    BookCategory.objects.create(book=book, category=category)
+            if extension:
+                run_in_background(process_cover_upload, book.id, spool_cover(book.id, cover))
+
+            # Handle categories (resolved and linked in bulk)
+            categories = set_book_categories(book.id, categories)
+
+            # Index title, author, description and categories for search
+            refresh_search_vector([book.id])
 
             return JsonResponse({
                 "code": 0,
@@ -84,10 +97,11 @@ def create_book_view(request):
                     "title": book.title,
                     "author": book.author,
                     "categories": categories,
-                    "price": str(book.price),
+                    "price": book.price,
                     "status": book.status,
-                    "created_at": book.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                    "created_at": book.created_at,
                     "cover_url": book.cover_url,
+                    "cover_status": book.cover_status,
                 }
             })
         else:
@@ -95,104 +109,157 @@ def create_book_view(request):
 
     return JsonResponse({"code": 1, "msg": "Invalid request method"})
 
-def upload_image_to_picgo(cover_file):
-    """Upload a file to PicGo server and return its URL"""
-    try:
-        # Get the original file extension
-        original_extension = os.path.splitext(cover_file.name)[1]
-        if not original_extension:
-            raise ValueError("Uploaded file does not have a valid extension.")
-
-        # Create a temporary file with the correct extension
-        with tempfile.NamedTemporaryFile(suffix=original_extension, delete=False) as temp_file:
-            for chunk in cover_file.chunks():
-                temp_file.write(chunk)  # Write chunks to the temporary file
-            
-            temp_file_path = temp_file.name  # Path to the temporary file
-
-            # Prepare JSON request body
-            data = json.dumps({'list': [temp_file_path]})
-            headers = {'Content-Type': 'application/json'}
-
-            # Send POST request to PicGo
-            response = requests.post(PICGO_UPLOAD_URL, data=data, headers=headers)
-
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('success'):
-                    return result.get('result')[0]  # Return the uploaded image URL
-                else:
-                    return None
-            else:
-                return None
-
-    except Exception as e:
-        return None
-    finally:
-        # Clean up the temporary file
-        if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-
-@csrf_exempt
-def book_list_view(request):
+# Read-only async views: under ASGI they wait on the database without holding a worker.
+# Only GET is served, so they do not need csrf_exempt (which wraps views synchronously in Django 4.2).
+async def book_list_view(request):
     """Return a list of books via GET request"""
     if request.method == 'GET':
-        books = Book.objects.prefetch_related('categories') \
-            .values(
-                'id', 
+        # ?with_publisher=1 embeds publisher_username via a join, saving a name lookup per book
+        with_publisher = request.GET.get('with_publisher') == '1'
+
+        async def load_page():
+            books = Book.objects.values(
+                'id',
                 'title',
-                'publisher_id', 
-                'author', 
-                'price', 
-                'status', 
+                'publisher_id',
+                'author',
+                'price',
+                'status',
                 'created_at',
-                'cover_url'
+                'cover_url',
+                'cover_key'
             )
+            if with_publisher:
+                books = books.annotate(publisher_username=F('publisher__username'))
+
+            # Fetch one keyset page, newest first
+            books, next_cursor = await akeyset_paginate(books, request)
 
-        # Build the response with category names for each book
-        book_list = []
-        for book in books:
-            categories_names = [
-                category.name for category in 
-                Category.objects.filter(bookcategory__book_id=book['id'])
-            ]
-            book_data = book
-            book_data['categories'] = categories_names  # Include category names
-            book_list.append(book_data)
+            # Build the response with category names for each book
+            return {"data": attach_thumbnails(await aattach_categories(books)), "next_cursor": next_cursor}
 
-        return JsonResponse({"code": 0, "data": book_list})
+        try:
+            cursor, page_size = request.GET.get('cursor', ''), get_page_size(request)
+
+            # Every write moves a book's updated_at (deletes lower the count), and the database
+            # is what every process agrees on, so this probe drives the validators and the cache
+            # key, like the updated_at probe in book_detail_view. Embedded usernames change with
+            # the publisher's updated_at.
+            probe = {'last_updated': Max('updated_at'), 'count': Count('id')}
+            if with_publisher:
+                probe['publisher_updated'] = Max('publisher__updated_at')
+            state = await Book.objects.aaggregate(**probe)
+            last_modified = max(filter(None, (state['last_updated'], state.get('publisher_updated'))), default=None)
+            version = ':'.join(str(value) for value in state.values())
+
+            etag = make_etag('book-list', cursor, page_size, with_publisher, version)
+            response = not_modified(request, etag=etag, last_modified=last_modified)
+            if response:
+                return response
+
+            # Pages are cached until any book changes (see book.cache)
+            page_key = await abook_list_key(cursor, page_size, with_publisher, version)
+            page = await acached(page_key, load_page)
+        except InvalidPageRequest as e:
+            return JsonResponse({"code": 1, "msg": str(e)})
+
+        response = JsonResponse({"code": 0, "data": page["data"], "next_cursor": page["next_cursor"]})
+        return set_validators(response, etag, last_modified)
 
     return JsonResponse({"code": 1, "msg": "Invalid request method"})
 
+def iter_book_chunks(queryset, chunk_size):
+    """Yield book dicts with categories and thumbnails attached, `chunk_size` rows at a time"""
+    chunk = []
+    # iterator() reads through a server-side cursor instead of loading every row first
+    for book in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(book)
+        if len(chunk) == chunk_size:
+            yield attach_thumbnails(attach_categories(chunk))
+            chunk = []
+    if chunk:
+        yield attach_thumbnails(attach_categories(chunk))
+
+async def aiter_book_chunks(queryset, chunk_size):
+    """Async counterpart of iter_book_chunks"""
+    chunk = []
+    async for book in queryset.aiterator(chunk_size=chunk_size):
+        chunk.append(book)
+        if len(chunk) == chunk_size:
+            yield attach_thumbnails(await aattach_categories(chunk))
+            chunk = []
+    if chunk:
+        yield attach_thumbnails(await aattach_categories(chunk))
+
 @csrf_exempt
-def book_detail_view(request, book_id):
+def book_export_view(request):
+    """Stream every book, newest first, as one JSON document"""
+    if request.method == 'GET':
+        books = Book.objects.order_by('-created_at', '-id').values(
+            'id',
+            'title',
+            'publisher_id',
+            'author',
+            'price',
+            'status',
+            'created_at',
+            'cover_url',
+            'cover_key'
+        )
+        # Memory stays flat at one chunk however large the catalog is. Each server needs
+        # its own kind of iterator: under ASGI, Django collects a sync iterator into a list
+        # before sending it (and under WSGI does the same to an async one)
+        if isinstance(request, ASGIRequest):
+            chunks = aiter_book_chunks(books, settings.BOOK_EXPORT_CHUNK_SIZE)
+        else:
+            chunks = iter_book_chunks(books, settings.BOOK_EXPORT_CHUNK_SIZE)
+        return StreamingJsonResponse(chunks)
+
+    return JsonResponse({"code": 1, "msg": "Invalid request method"})
+
+async def book_detail_view(request, book_id):
     """Return details of a single book via GET request"""
     if request.method == 'GET':
-        try:
-            book = Book.objects.filter(id=book_id).values(
-                'id', 
+        async def load_book():
+            book = await Book.objects.filter(id=book_id).values(
+                'id',
                 'title',
                 'publisher_id',
-                'author', 
-                'description', 
-                'price', 
-                'status', 
+                'author',
+                'description',
+                'price',
+                'status',
                 'created_at',
-                'cover_url'
-            ).first()
+                'cover_url',
+                'cover_key',
+                'updated_at'
+            ).afirst()
 
-            if not book:
+            # Retrieve categories associated with the book
+            if book:
+                attach_thumbnails(await aattach_categories([book]), size='large')
+            return book
+
+        try:
+            # Every change to a book moves its updated_at, and the database is what every
+            # process (web workers and management commands alike) agrees on, so this
+            # primary-key probe drives both the validators and the cache key
+            updated_at = await Book.objects.filter(id=book_id).values_list('updated_at', flat=True).afirst()
+            if updated_at is None:
                 return JsonResponse({"code": 1, "msg": "Book does not exist"})
 
-            # Retrieve categories associated with the book
-            categories_names = [
-                category.name for category in 
-                Category.objects.filter(bookcategory__book_id=book['id'])
-            ]
+            etag = make_etag('book', book_id, updated_at.isoformat())
+            response = not_modified(request, etag=etag, last_modified=updated_at)
+            if response:
+                return response
 
-            book['categories'] = categories_names
+            # Cached per book until its version is bumped or it is updated (see book.cache)
+            book = await acached(await abook_detail_key(book_id, updated_at.isoformat()), load_book)
 
-            return JsonResponse({"code": 0, "data": book})
+            if not book:
+                return JsonResponse({"code": 1, "msg": "Book does not exist"})
+
+            return set_validators(JsonResponse({"code": 0, "data": book}), etag, updated_at)
 
         except Exception as e:
             return JsonResponse({"code": 1, "msg": f"Error: {str(e)}"})
@@ -200,62 +267,103 @@ def book_detail_view(request, book_id):
     return JsonResponse({"code": 1, "msg": "Invalid request method"})
 
 @csrf_exempt
-def search_books_view(request):
-    """Search books by title or category name using a query parameter"""
+def book_cover_view(request, key, size):
+    """Serve a locally stored cover, resized to one of COVER_THUMBNAIL_SIZES"""
+    if request.method == 'GET':
+        if not COVER_KEY_RE.match(key) or (size != 'original' and size not in settings.COVER_THUMBNAIL_SIZES):
+            return JsonResponse({"code": 1, "msg": "Cover does not exist"}, status=404)
+
+        # Keys are content hashes, so a given (key, size) never changes
+        etag = f'"{key[:64]}-{size}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            path = get_thumbnail(key, size)
+            if path is None:
+                return JsonResponse({"code": 1, "msg": "Cover does not exist"}, status=404)
+            response = FileResponse(open(path, 'rb'), content_type=mimetypes.guess_type(path)[0])
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+    return JsonResponse({"code": 1, "msg": "Invalid request method"})
+
+@csrf_exempt
+def book_cache_stats_view(request):
+    """Return hit/miss/eviction counters of the book response cache in this worker"""
+    if request.method == 'GET':
+        return JsonResponse({"code": 0, "data": cache_stats()})
+
+    return JsonResponse({"code": 1, "msg": "Invalid request method"})
+
+async def search_books_view(request):
+    """Full-text search over title, author, description and category names, ranked by relevance"""
     if request.method == 'GET':
         query = request.GET.get('query', '').strip()  # Get the search query
 
         if not query:
             return JsonResponse({"code": 1, "msg": "Query parameter is required"})
 
-        # Build filter criteria for title and category name
-        filter_args = (
-            Q(title__icontains=query) | Q(bookcategory__category__name__icontains=query)
+        # Fetch matching books, best match first
+        books = search_books(query).values(
+            'id',
+            'title',
+            'publisher_id',
+            'author',
+            'price',
+            'status',
+            'cover_url',
+            'cover_key',
+            'created_at',
+            'rank'
         )
 
-        # Fetch matching books with related categories
-        books = Book.objects.prefetch_related('categories') \
-            .filter(filter_args) \
-            .distinct()  # Avoid duplicate results
+        try:
+            books, next_cursor = await akeyset_paginate(books, request, keys=('rank', 'id'))
+        except InvalidPageRequest as e:
+            return JsonResponse({"code": 1, "msg": str(e)})
 
         # Extract book details and category names
-        book_list = []
-        for book in books:
-            categories_names = [
-                category.name for category in 
-                Category.objects.filter(bookcategory__book_id=book.id)
-            ]
-            book_data = {
-                "id": book.id,
-                "title": book.title,
-                "publisher_id": book.publisher_id,
-                "author": book.author,
-                "price": str(book.price),
-                "status": book.status,
-                "cover_url": book.cover_url,
-                "created_at": book.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                "categories": categories_names,
-            }
-            book_list.append(book_data)
-
-        return JsonResponse({"code": 0, "data": book_list})
+        book_list = attach_thumbnails(await aattach_categories(books))
+
+        return JsonResponse({"code": 0, "data": book_list, "next_cursor": next_cursor})
 
     return JsonResponse({"code": 1, "msg": "Invalid request method"})
 
 @csrf_exempt
+def suggest_books_view(request):
+    """Return title and author completions for a type-ahead prefix"""
+    if request.method == 'GET':
+        prefix = request.GET.get('prefix', '').strip()
+
+        if not prefix:
+            return JsonResponse({"code": 1, "msg": "Prefix parameter is required"})
+
+        try:
+            limit = int(request.GET.get('limit', settings.BOOK_SUGGEST_DEFAULT_LIMIT))
+        except ValueError:
+            return JsonResponse({"code": 1, "msg": "Invalid limit"})
+
+        # Bound the response size regardless of what the client asks for
+        limit = max(1, min(limit, settings.BOOK_SUGGEST_MAX_LIMIT))
+        prefix = prefix[:settings.BOOK_SUGGEST_MAX_PREFIX]
+
+        suggestions = get_suggest_index().suggest(prefix, limit)
+
+        return JsonResponse({"code": 0, "data": suggestions})
+
+    return JsonResponse({"code": 1, "msg": "Invalid request method"})
+
+@csrf_exempt
+@jwt_required
 def published_books_view(request):
     """Get list of all published books by the current user"""
     if request.method == 'GET':
-        try:
-            token = verify_and_refresh_token(request)
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']  # Extract user ID from the token
-        except Exception as e:
-            return JsonResponse({"code": 1, "msg": f"Token verification failed: {str(e)}"})
+        user_id = request.user_id  # Extract user ID from the token
 
         # Fetch books published by the user
-        books = Book.objects.prefetch_related('categories') \
-            .filter(publisher_id=user_id) \
+        books = Book.objects.filter(publisher_id=user_id) \
             .values(
                 'id', 
                 'title', 
@@ -263,38 +371,31 @@ def published_books_view(request):
                 'price', 
                 'status', 
                 'cover_url',
+                'cover_key',
                 'created_at'
             )
 
-        # Include category names
-        book_list = []
-        for book in books:
-            categories_names = [
-                category.name for category in 
-                Category.objects.filter(bookcategory__book_id=book['id'])
-            ]
-            book_data = book
-            book_data['categories'] = categories_names
-            book_list.append(book_data)
+        try:
+            books, next_cursor = keyset_paginate(books, request)
+        except InvalidPageRequest as e:
+            return JsonResponse({"code": 1, "msg": str(e)})
 
-        return JsonResponse({"code": 0, "data": book_list})
+        # Include category names and thumbnail URLs
+        book_list = attach_thumbnails(attach_categories(books))
+
+        return JsonResponse({"code": 0, "data": book_list, "next_cursor": next_cursor})
 
     return JsonResponse({"code": 1, "msg": "Invalid request method"})
 
 @csrf_exempt
+@jwt_required
 def sold_out_books_view(request):
     """Get sold-out books published by the current user"""
     if request.method == 'GET':
-        try:
-            token = verify_and_refresh_token(request)
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']  # Extract user ID from the token
-        except Exception as e:
-            return JsonResponse({"code": 1, "msg": f"Token verification failed: {str(e)}"})
+        user_id = request.user_id  # Extract user ID from the token
 
         # Fetch sold books published by the user
-        books = Book.objects.prefetch_related('categories') \
-            .filter(publisher_id=user_id, status='sold') \
+        books = Book.objects.filter(publisher_id=user_id, status='sold') \
             .values(
                 'id', 
                 'title', 
@@ -302,21 +403,19 @@ def sold_out_books_view(request):
                 'price', 
                 'status', 
                 'cover_url',
+                'cover_key',
                 'created_at'
             )
 
-        # Include category names
-        book_list = []
-        for book in books:
-            categories_names = [
-                category.name for category in 
-                Category.objects.filter(bookcategory__book_id=book['id'])
-            ]
-            book_data = book
-            book_data['categories'] = categories_names
-            book_list.append(book_data)
+        try:
+            books, next_cursor = keyset_paginate(books, request)
+        except InvalidPageRequest as e:
+            return JsonResponse({"code": 1, "msg": str(e)})
+
+        # Include category names and thumbnail URLs
+        book_list = attach_thumbnails(attach_categories(books))
 
-        return JsonResponse({"code": 0, "data": book_list})
+        return JsonResponse({"code": 0, "data": book_list, "next_cursor": next_cursor})
 
     return JsonResponse({"code": 1, "msg": "Invalid request method"})
 
@@ -327,14 +426,9 @@ class UpdateBookForm(ModelForm):
         fields = ['description']
 
 @csrf_exempt
+@jwt_required
 def update_book_view(request, book_id):
-    # Verify and refresh token
-    try:
-        token = verify_and_refresh_token(request)
-        access_token = AccessToken(token)
-        user_id = access_token['user_id']  # 从 token 中获取 user_id
-    except Exception as e:
-        return JsonResponse({"code": 1, "msg": f"Token 验证失败: {str(e)}"})
+    user_id = request.user_id  # 从 token 中获取 user_id
 
     # 检查书籍是否存在
     try:
@@ -354,14 +448,14 @@ def update_book_view(request, book_id):
         book = form.save(commit=False)
         book.save()  # 保存更新的书籍描述
 
-        # 更新书籍类别
+        # 更新书籍类别（批量解析类别名并替换关联）；未传类别时读取现有类别
         if categories:
-            category_objects = []
-            for name in categories:
-                category, _ = Category.objects.get_or_create(name=name)  # 创建或获取类别
-                category_objects.append(category)
+            category_names = set_book_categories(book.id, categories, replace=True)
+        else:
+            category_names = load_category_names([book.id]).get(book.id, [])
 
-            book.categories.set(category_objects)  # 更新类别关联
+        # 重新计算全文检索向量（简介或类别可能已变化）
+        refresh_search_vector([book.id])
 
         # 序列化书籍数据
         book_data = {
@@ -369,10 +463,10 @@ def update_book_view(request, book_id):
             "title": book.title,
             "author": book.author,
             "description": book.description,
-            "price": str(book.price),
+            "price": book.price,
             "status": book.status,
-            "created_at": book.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            "categories": [category.name for category in book.categories.all()],
+            "created_at": book.created_at,
+            "categories": category_names,
             "publisher_id": user_id,
             "cover_url":book.cover_url,
         }
@@ -383,15 +477,11 @@ def update_book_view(request, book_id):
 
 
 @csrf_exempt
+@jwt_required
 def delete_book_view(request, book_id):
     """删除书籍视图"""
     if request.method == 'DELETE':
-        try:
-            token = verify_and_refresh_token(request)
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']  # 从 token 中获取 user_id
-        except Exception as e:
-            return JsonResponse({"code": 1, "msg": f"Token 验证失败: {str(e)}"})
+        user_id = request.user_id  # 从 token 中获取 user_id
 
         try:
             # 获取书籍
@@ -0,0 +1,96 @@
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from book.models import Book
+from order.models import Order
+from order.services import create_order, OrderError
+from utils.seed import seeded_test_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress the purchase path on a throwaway seeded database: many threads racing for the "
+        "same book (contended) versus each thread buying its own books (uncontended)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--rounds', type=int, default=50, help="Books raced for in the contended run")
+        parser.add_argument('--books-per-thread', type=int, default=50, help="Books bought in the uncontended run")
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        rounds = options['rounds']
+        per_thread = options['books_per_thread']
+
+        # 用户 0 发布所有书籍，其余用户作为买家
+        with seeded_test_database(users=threads + 1, books=0, categories=1, orders=0) as seeded:
+            seller_id, buyer_ids = seeded['user_ids'][0], seeded['user_ids'][1:]
+            book_ids = self.publish(seller_id, rounds + threads * per_thread)
+            contended_ids, uncontended_ids = book_ids[:rounds], book_ids[rounds:]
+
+            # Contended: every thread tries to buy the same book each round
+            successes = []
+            started = time.perf_counter()
+            for book_id in contended_ids:
+                successes.append(self.race(buyer_ids, lambda buyer_id: [book_id]))
+            contended_elapsed = time.perf_counter() - started
+
+            oversold = [
+                book_id for book_id in contended_ids
+                if Order.objects.filter(book_id=book_id).count() != 1
+            ]
+            if oversold or any(count != 1 for count in successes):
+                raise CommandError(f"Books sold more than once or not at all: {oversold}")
+            attempts = rounds * threads
+            self.stdout.write(
+                f"contended: {attempts} attempts on {rounds} books in {contended_elapsed:.2f}s "
+                f"({attempts / contended_elapsed:.0f} attempts/s), exactly one order per book"
+            )
+
+            # Uncontended: each thread buys its own slice of books
+            slices = {
+                buyer_id: uncontended_ids[i * per_thread:(i + 1) * per_thread]
+                for i, buyer_id in enumerate(buyer_ids)
+            }
+            started = time.perf_counter()
+            bought = self.race(buyer_ids, lambda buyer_id: slices[buyer_id])
+            uncontended_elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"uncontended: {bought} purchases in {uncontended_elapsed:.2f}s "
+                f"({bought / uncontended_elapsed:.0f} purchases/s)"
+            )
+
+    def publish(self, seller_id, count):
+        books = Book.objects.bulk_create([
+            Book(title=f'Stress book {i}', author='Stress', publisher_id=seller_id, price=10, status='available')
+            for i in range(count)
+        ])
+        return [book.id for book in books]
+
+    def race(self, buyer_ids, books_for):
+        """Start one thread per buyer at the same moment; return the number of successful purchases"""
+        barrier = threading.Barrier(len(buyer_ids))
+        lock = threading.Lock()
+        succeeded = [0]
+
+        def buy(buyer_id):
+            try:
+                barrier.wait()
+                for book_id in books_for(buyer_id):
+                    try:
+                        create_order(buyer_id, book_id)
+                    except OrderError:
+                        continue
+                    with lock:
+                        succeeded[0] += 1
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=buy, args=(buyer_id,)) for buyer_id in buyer_ids]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return succeeded[0]
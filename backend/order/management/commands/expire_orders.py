@@ -0,0 +1,42 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.timezone import now
+from order.services import expire_pending_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancel pending orders older than ORDER_PAYMENT_TIMEOUT in bounded batches and release "
+        "their books; with --loop keep sweeping every --interval seconds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help="Keep running instead of sweeping once")
+        parser.add_argument('--interval', type=float, default=60, help="Seconds between sweeps with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            self.sweep(options['batch_size'])
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+            close_old_connections()
+
+    def sweep(self, batch_size):
+        # One cutoff per run, so orders expiring mid-run wait for the next one
+        cutoff = now() - settings.ORDER_PAYMENT_TIMEOUT
+        started = time.perf_counter()
+        swept = batches = 0
+        while True:
+            count = expire_pending_orders(batch_size, cutoff)
+            swept += count
+            batches += 1
+            if count < batch_size:
+                break
+        self.stdout.write(
+            f"{now():%Y-%m-%d %H:%M:%S} expired {swept} pending orders "
+            f"in {batches} batches ({time.perf_counter() - started:.2f}s)"
+        )
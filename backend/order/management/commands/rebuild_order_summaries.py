@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from order.summary import rebuild_order_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's OrderSummary row from the Order table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        count = rebuild_order_summaries(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt order summaries for {count} users"))
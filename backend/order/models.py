@@ -18,5 +18,45 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # /api/order/list：买家订单按 (created_at, id) 倒序分页
+            models.Index(fields=['buyer', '-created_at', '-id'], name='order_buyer_created_idx'),
+            # /api/order/list?role=seller：卖家订单按 (created_at, id) 倒序分页
+            models.Index(fields=['seller', '-created_at', '-id'], name='order_seller_created_idx'),
+            # 卖家按状态查询订单
+            models.Index(fields=['seller', 'status'], name='order_seller_status_idx'),
+            # 待支付订单（部分索引，用于查找超时未支付的订单）
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(status='pending'),
+                name='order_pending_created_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Order {self.id} - {self.book.title}"
+
+
+class OrderSummary(models.Model):
+    """
+    每个用户的订单汇总（反范式）。
+
+    在下单、支付、取消的同一事务中增量更新（见 order/summary.py），
+    读取时只需按主键取一行，不必每次聚合整张订单表。
+    """
+    user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name='order_summary')
+    # 作为买家
+    bought_pending = models.IntegerField(default=0)
+    bought_paid = models.IntegerField(default=0)
+    bought_cancelled = models.IntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # 作为卖家
+    sold_pending = models.IntegerField(default=0)
+    sold_paid = models.IntegerField(default=0)
+    sold_cancelled = models.IntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"OrderSummary {self.user_id}"
@@ -0,0 +1,146 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.timezone import now
+from book.cache import bump_book_version
+from book.models import Book
+from .models import Order
+from .summary import adjust_summaries, record_transition, transition_changes
+
+
+class OrderError(Exception):
+    """订单业务规则校验失败，消息直接返回给前端"""
+
+
+def create_order(buyer_id, book_id):
+    """
+    下单并预订书籍。
+
+    通过条件 UPDATE ... WHERE status='available' 抢占书籍：并发下单时数据库
+    行锁保证只有一个事务能把书籍改为 reserved，其余事务更新 0 行后失败。
+    """
+    with transaction.atomic():
+        book = Book.objects.filter(id=book_id).values('publisher_id', 'price', 'status').first()
+        if not book or book['status'] != 'available':
+            raise OrderError("书籍不存在或不可用")
+
+        if buyer_id == book['publisher_id']:
+            raise OrderError("不可购买自己发布的书籍")
+
+        reserved = Book.objects.filter(id=book_id, status='available') \
+            .update(status='reserved', updated_at=now())
+        if not reserved:
+            raise OrderError("书籍不存在或不可用")
+
+        order = Order.objects.create(
+            buyer_id=buyer_id,
+            seller_id=book['publisher_id'],
+            book_id=book_id,
+            price=book['price'],  # 直接从书籍信息获取价格
+            status='pending',  # 默认状态为待支付
+        )
+        record_transition(order, None, 'pending')  # 同一事务内更新买卖双方的订单汇总
+        return order
+
+
+def _lock_order(buyer_id, order_id, action, statuses=('pending',)):
+    """在当前事务中锁定买家的订单，并确认订单处于 statuses 之一"""
+    try:
+        order = Order.objects.select_for_update().get(id=order_id)
+    except Order.DoesNotExist:
+        raise OrderError("订单不存在")
+
+    if order.buyer_id != buyer_id:
+        raise OrderError(f"无权{action}此订单")
+
+    if order.status not in statuses:
+        raise OrderError(f"订单状态不允许{action}")
+
+    return order
+
+
+def pay_order(buyer_id, order_id):
+    """支付订单，并将预订的书籍标记为已售出"""
+    with transaction.atomic():
+        order = _lock_order(buyer_id, order_id, '支付')
+        # 超时未支付的订单即使还没被 expire_orders 清理，也不能再支付
+        if order.created_at < now() - settings.ORDER_PAYMENT_TIMEOUT:
+            raise OrderError("订单已超时，请重新下单")
+        order.status = 'paid'
+        order.save(update_fields=['status', 'updated_at'])
+        Book.objects.filter(id=order.book_id, status='reserved').update(status='sold', updated_at=now())
+        record_transition(order, 'pending', 'paid')
+        return order
+
+
+def cancel_order(buyer_id, order_id):
+    """
+    取消订单并让书籍重新上架。
+
+    待支付订单直接取消，释放预订的书籍；已支付订单视为退款，已售出的书籍
+    恢复为可购买，订单汇总中扣回相应的消费和收入。
+    """
+    with transaction.atomic():
+        order = _lock_order(buyer_id, order_id, '取消', statuses=('pending', 'paid'))
+        previous_status = order.status
+        order.status = 'cancelled'
+        order.save(update_fields=['status', 'updated_at'])
+        book_status = 'reserved' if previous_status == 'pending' else 'sold'
+        Book.objects.filter(id=order.book_id, status=book_status).update(status='available', updated_at=now())
+        record_transition(order, previous_status, 'cancelled')
+        return order
+
+
+def _cancel_expired_batch(cutoff, batch_size):
+    """取消一批超时订单，返回被取消订单的 (buyer_id, seller_id, book_id, price) 列表"""
+    if connection.vendor == 'postgresql':
+        # 单条 UPDATE：子查询走部分索引 order_pending_created_idx 取最早的一批，
+        # SKIP LOCKED 跳过正在被支付/取消的订单，RETURNING 带回后续处理所需的字段
+        table = connection.ops.quote_name(Order._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} SET status = 'cancelled', updated_at = %s
+                WHERE id IN (
+                    SELECT id FROM {table}
+                    WHERE status = 'pending' AND created_at < %s
+                    ORDER BY created_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ) AND status = 'pending'
+                RETURNING buyer_id, seller_id, book_id, price
+                """,
+                [now(), cutoff, batch_size],
+            )
+            return cursor.fetchall()
+
+    rows = list(
+        Order.objects.select_for_update(skip_locked=True)
+        .filter(status='pending', created_at__lt=cutoff)
+        .order_by('created_at')
+        .values_list('id', 'buyer_id', 'seller_id', 'book_id', 'price')[:batch_size]
+    )
+    Order.objects.filter(id__in=[row[0] for row in rows], status='pending') \
+        .update(status='cancelled', updated_at=now())
+    return [row[1:] for row in rows]
+
+
+def expire_pending_orders(batch_size=500, cutoff=None):
+    """
+    取消一批超过 ORDER_PAYMENT_TIMEOUT 仍未支付的订单，返回取消的数量。
+
+    同一事务中释放预订的书籍并更新订单汇总；返回值小于 batch_size 说明已清理完。
+    """
+    cutoff = cutoff or now() - settings.ORDER_PAYMENT_TIMEOUT
+    with transaction.atomic():
+        rows = _cancel_expired_batch(cutoff, batch_size)
+        if not rows:
+            return 0
+        book_ids = [book_id for _, _, book_id, _ in rows]
+        Book.objects.filter(id__in=book_ids, status='reserved').update(status='available', updated_at=now())
+        adjust_summaries(transition_changes(
+            [(buyer_id, seller_id, price) for buyer_id, seller_id, _, price in rows], 'pending', 'cancelled'
+        ))
+
+    # UPDATE 不触发模型信号，手动让这些书籍的缓存失效
+    bump_book_version(*book_ids)
+    return len(rows)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from book.cache import bump_book_version
+from .models import Order
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_ordered_book_cache(sender, instance, **kwargs):
+    # 订单状态变化会同时改变书籍状态，需要让书籍缓存失效
+    bump_book_version(instance.book_id)
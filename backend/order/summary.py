@@ -0,0 +1,87 @@
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.utils.timezone import now
+from .models import Order, OrderSummary
+
+SUMMARY_FIELDS = [
+    'bought_pending', 'bought_paid', 'bought_cancelled', 'total_spent',
+    'sold_pending', 'sold_paid', 'sold_cancelled', 'total_revenue',
+]
+
+
+def adjust_summaries(changes):
+    """
+    在当前事务中增量更新订单汇总，changes 为 {用户 id: {字段: 增量}}。
+
+    使用 F() 表达式更新，并发事务不会互相覆盖；按用户 id 顺序加行锁，
+    避免两个买卖方向相反的事务互相等待造成死锁。
+    """
+    for user_id in sorted(changes):
+        fields = {name: F(name) + delta for name, delta in changes[user_id].items() if delta}
+        if not fields:
+            continue
+        fields['updated_at'] = now()
+        if not OrderSummary.objects.filter(user_id=user_id).update(**fields):
+            # 第一次产生订单的用户还没有汇总行
+            OrderSummary.objects.bulk_create([OrderSummary(user_id=user_id)], ignore_conflicts=True)
+            OrderSummary.objects.filter(user_id=user_id).update(**fields)
+
+
+def transition_changes(orders, from_status, to_status):
+    """计算一批订单从 from_status（新订单为 None）变为 to_status 时各用户汇总的增量"""
+    changes = defaultdict(lambda: defaultdict(int))
+    for buyer_id, seller_id, price in orders:
+        buyer, seller = changes[buyer_id], changes[seller_id]
+        if from_status:
+            buyer[f'bought_{from_status}'] -= 1
+            seller[f'sold_{from_status}'] -= 1
+        buyer[f'bought_{to_status}'] += 1
+        seller[f'sold_{to_status}'] += 1
+        if to_status == 'paid':
+            buyer['total_spent'] += price
+            seller['total_revenue'] += price
+        elif from_status == 'paid':
+            # 退款：扣回已计入的消费和收入
+            buyer['total_spent'] -= price
+            seller['total_revenue'] -= price
+    return changes
+
+
+def record_transition(order, from_status, to_status):
+    """在当前事务中记录单个订单的状态变化"""
+    adjust_summaries(transition_changes([(order.buyer_id, order.seller_id, order.price)], from_status, to_status))
+
+
+def _lock_summaries():
+    # EXCLUSIVE 模式仍允许读取，但阻塞其他事务对汇总表的增量更新，直到重建提交
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {connection.ops.quote_name(OrderSummary._meta.db_table)} IN EXCLUSIVE MODE')
+
+
+def rebuild_order_summaries(batch_size=2000):
+    """
+    按订单表重新聚合所有用户的汇总，返回汇总行数。
+
+    用于初始化、批量导入或怀疑汇总漂移之后。先锁汇总表再聚合：已提交的订单
+    计入重建结果，尚未提交的订单在锁释放后照常做增量更新，两者不会重复或遗漏。
+    """
+    with transaction.atomic():
+        _lock_summaries()
+
+        summaries = defaultdict(dict)
+        for role, prefix, total_field in (('buyer_id', 'bought', 'total_spent'), ('seller_id', 'sold', 'total_revenue')):
+            rows = Order.objects.order_by().values(role, 'status').annotate(count=Count('id'), total=Sum('price'))
+            for row in rows:
+                summary = summaries[row[role]]
+                summary[f'{prefix}_{row["status"]}'] = row['count']
+                if row['status'] == 'paid':
+                    summary[total_field] = row['total']
+
+        OrderSummary.objects.all().delete()
+        OrderSummary.objects.bulk_create(
+            [OrderSummary(user_id=user_id, **fields) for user_id, fields in summaries.items()],
+            batch_size=batch_size,
+        )
+    return len(summaries)
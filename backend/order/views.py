@@ -1,30 +1,32 @@
-from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.forms import ModelForm
-from django.utils.timezone import now
-from order.models import Order
-from book.models import Book
-from rest_framework_simplejwt.tokens import AccessToken
-from utils.jwt import verify_and_refresh_token
-
-# 定义 Order 创建表单
-class CreateOrderForm(ModelForm):
-    class Meta:
-        model = Order
-        fields = ['buyer', 'seller', 'book', 'price', 'status']
+from order.models import Order, OrderSummary
+from order.summary import SUMMARY_FIELDS
+from order.services import create_order, pay_order, cancel_order, OrderError
+from utils.conditional import make_etag, not_modified, set_validators
+from utils.jwt import jwt_required
+from utils.response import JsonResponse
+from utils.pagination import keyset_paginate, InvalidPageRequest
+
+# 将订单序列化为响应数据
+def serialize_order(order):
+    return {
+        "id": order.id,
+        "buyer_id": order.buyer_id,
+        "seller_id": order.seller_id,
+        "book_id": order.book_id,
+        "price": order.price,  # Decimal 和时间由 utils.response 统一编码
+        "status": order.status,
+        "created_at": order.created_at,
+        "updated_at": order.updated_at,
+    }
 
 @method_decorator(csrf_exempt, name='dispatch')
+@jwt_required
 def create_order_view(request):
     """创建订单视图"""
     if request.method == 'POST':
-        # 验证并刷新 token
-        try:
-            token = verify_and_refresh_token(request)
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']  # 从 token 中获取 user_id
-        except Exception as e:
-            return JsonResponse({"code": 1, "msg": f"Token 验证失败: {str(e)}"})
+        user_id = request.user_id  # 从 token 中获取 user_id
 
         # 获取前端请求数据
         book_id = request.POST.get('book_id')
@@ -32,84 +34,70 @@ def create_order_view(request):
         if not book_id:
             return JsonResponse({"code": 1, "msg": "请求参数缺失"})
 
-        # 确认图书是否存在并获取卖家信息
+        # 在事务中预订书籍并创建订单（并发下单时只有一个能成功）
         try:
-            book = Book.objects.get(id=book_id, status='available')  # 确保书籍状态可用
-            seller_id = book.publisher_id  # 获取书籍的发布者作为卖家 ID
-        except Book.DoesNotExist:
-            return JsonResponse({"code": 1, "msg": "书籍不存在或不可用"})
-
-        if user_id == seller_id:
-            return JsonResponse({"code": 1, "msg": "不可购买自己发布的书籍"})
-
-        # 构建包含所有字段数据的字典
-        order_data = {
-            'buyer': user_id,
-            'seller': seller_id,
-            'book': book_id,
-            'price': book.price,  # 直接从书籍信息获取价格
-            'status': 'pending',  # 默认状态为待支付
-        }
-
-        # 创建 Order 表单实例并传入数据
-        form = CreateOrderForm(order_data)
-
-        if form.is_valid():
-            # 保存订单时，先不要提交到数据库
-            order = form.save(commit=False)
-            order.created_at = now()  # 设置订单创建时间
-            order.save()  # 保存订单实例
-
-            # 返回成功的响应
-            return JsonResponse({
-                "code": 0,
-                "msg": "订单创建成功",
-                "data": {
-                    "id": order.id,
-                    "buyer_id": order.buyer_id,
-                    "seller_id": order.seller_id,
-                    "book_id": order.book_id,
-                    "price": str(order.price),  # DecimalField 转为字符串
-                    "status": order.status,
-                    "created_at": order.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    "updated_at": order.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                }
-            })
-        else:
-            return JsonResponse({"code": 1, "msg": f"订单创建失败: {form.errors}"})
+            order = create_order(user_id, book_id)
+        except OrderError as e:
+            return JsonResponse({"code": 1, "msg": str(e)})
+
+        # 返回成功的响应
+        return JsonResponse({
+            "code": 0,
+            "msg": "订单创建成功",
+            "data": serialize_order(order)
+        })
 
     return JsonResponse({"code": 1, "msg": "无效的请求方法"})
 
 @method_decorator(csrf_exempt, name='dispatch')
+@jwt_required
 def order_list_view(request):
     """订单列表视图"""
     if request.method == 'GET':
-        try:
-            token = verify_and_refresh_token(request)
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']  # 从 token 中获取 user_id
-        except Exception as e:
-            return JsonResponse({"code": 1, "msg": f"Token 验证失败: {str(e)}"})
-
-        # 获取当前用户作为买家或卖家的所有订单
-        orders = Order.objects.filter(buyer_id=user_id).values(
+        user_id = request.user_id  # 从 token 中获取 user_id
+
+        # ?role=buyer（默认）返回我买到的订单，?role=seller 返回我卖出的订单
+        role = request.GET.get('role', 'buyer')
+        if role not in ('buyer', 'seller'):
+            return JsonResponse({"code": 1, "msg": "role 参数只能是 buyer 或 seller"})
+
+        # 获取当前用户对应角色的订单（按创建时间倒序分页）
+        orders = Order.objects.filter(**{f'{role}_id': user_id}).values(
             'id', 'buyer_id', 'seller_id', 'book_id', 'price', 'status', 'created_at', 'updated_at'
         )
-        return JsonResponse({"code": 0, "data": list(orders)})
+        try:
+            orders, next_cursor = keyset_paginate(orders, request)
+        except InvalidPageRequest as e:
+            return JsonResponse({"code": 1, "msg": f"分页参数无效: {str(e)}"})
+
+        return JsonResponse({"code": 0, "data": orders, "next_cursor": next_cursor})
+
+    return JsonResponse({"code": 1, "msg": "无效的请求方法"})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+@jwt_required
+def order_summary_view(request):
+    """订单汇总视图：买卖双方各状态订单数、累计消费和累计收入"""
+    if request.method == 'GET':
+        user_id = request.user_id  # 从 token 中获取 user_id
+
+        # 汇总表按主键取一行；还没有订单的用户没有汇总行，全部返回 0
+        summary = OrderSummary.objects.filter(user_id=user_id).values(*SUMMARY_FIELDS).first()
+        if summary is None:
+            summary = {field: 0 for field in SUMMARY_FIELDS}
+
+        return JsonResponse({"code": 0, "data": summary})
 
     return JsonResponse({"code": 1, "msg": "无效的请求方法"})
 
 
 @method_decorator(csrf_exempt, name='dispatch')
+@jwt_required
 def order_detail_view(request, order_id):
     """订单详情视图"""
     if request.method == 'GET':
-        try:
-            token = verify_and_refresh_token(request)
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']  # 从 token 中获取 user_id
-        except Exception as e:
-            return JsonResponse({"code": 1, "msg": f"Token 验证失败: {str(e)}"})
+        user_id = request.user_id  # 从 token 中获取 user_id
 
         try:
             # 查找订单
@@ -121,7 +109,14 @@ def order_detail_view(request, order_id):
             if order['buyer_id'] != user_id and order['seller_id'] != user_id:
                 return JsonResponse({"code": 1, "msg": "无权查看该订单"})
 
-            return JsonResponse({"code": 0, "data": order})
+            # 订单未变化（updated_at 相同）时直接返回 304，不再序列化
+            etag = make_etag('order', order['id'], order['updated_at'].isoformat())
+            response = not_modified(request, etag, order['updated_at'], cache_control='private, no-cache')
+            if response:
+                return response
+
+            response = JsonResponse({"code": 0, "data": order})
+            return set_validators(response, etag, order['updated_at'], cache_control='private, no-cache')
 
         except Order.DoesNotExist:
             return JsonResponse({"code": 1, "msg": "订单不存在"})
@@ -129,15 +124,11 @@ def order_detail_view(request, order_id):
     return JsonResponse({"code": 1, "msg": "无效的请求方法"})
 
 @method_decorator(csrf_exempt, name='dispatch')
+@jwt_required
 def pay_order_view(request):
     """支付订单视图"""
     if request.method == 'POST':
-        try:
-            token = verify_and_refresh_token(request)
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']  # 从 token 中获取 user_id
-        except Exception as e:
-            return JsonResponse({"code": 1, "msg": f"Token 验证失败: {str(e)}"})
+        user_id = request.user_id  # 从 token 中获取 user_id
 
         # 获取 form-data 中传递的 order_id
         order_id = request.POST.get('order_id')
@@ -145,52 +136,26 @@ def pay_order_view(request):
         if not order_id:
             return JsonResponse({"code": 1, "msg": "请求参数缺失: order_id"})
 
+        # 修改订单状态为已支付，并将书籍标记为已售出
         try:
-            # 查找订单
-            order = Order.objects.get(id=order_id)
-
-            # 确认订单是否属于当前用户（买家）
-            if order.buyer_id != user_id:
-                return JsonResponse({"code": 1, "msg": "无权支付此订单"})
-
-            # 确认订单状态为待支付
-            if order.status != 'pending':
-                return JsonResponse({"code": 1, "msg": "订单状态不允许支付"})
-
-            # 修改订单状态为已支付
-            order.status = 'paid'
-            order.updated_at = now()
-            order.save()
-
-            return JsonResponse({
-                "code": 0,
-                "msg": "订单支付成功",
-                "data": {
-                    "id": order.id,
-                    "buyer_id": order.buyer_id,
-                    "seller_id": order.seller_id,
-                    "book_id": order.book_id,
-                    "price": str(order.price),  # DecimalField 转为字符串
-                    "status": order.status,
-                    "created_at": order.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    "updated_at": order.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                }
-            })
-        except Order.DoesNotExist:
-            return JsonResponse({"code": 1, "msg": "订单不存在"})
+            order = pay_order(user_id, order_id)
+        except OrderError as e:
+            return JsonResponse({"code": 1, "msg": str(e)})
+
+        return JsonResponse({
+            "code": 0,
+            "msg": "订单支付成功",
+            "data": serialize_order(order)
+        })
 
     return JsonResponse({"code": 1, "msg": "无效的请求方法"})
 
 @method_decorator(csrf_exempt, name='dispatch')
+@jwt_required
 def cancel_order_view(request):
     """取消订单视图"""
     if request.method == 'POST':
-        try:
-            token = verify_and_refresh_token(request)
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']  # 从 token 中获取 user_id
-        except Exception as e:
-            return JsonResponse({"code": 1, "msg": f"Token 验证失败: {str(e)}"})
+        user_id = request.user_id  # 从 token 中获取 user_id
 
         # 获取 form-data 中传递的 order_id
         order_id = request.POST.get('order_id')
@@ -198,34 +163,16 @@ def cancel_order_view(request):
         if not order_id:
             return JsonResponse({"code": 1, "msg": "请求参数缺失: order_id"})
 
+        # 修改订单状态为已取消，并释放预订的书籍
         try:
-            # 查找订单
-            order = Order.objects.get(id=order_id)
-
-            # 确认订单是否属于当前用户（买家）
-            if order.buyer_id != user_id:
-                return JsonResponse({"code": 1, "msg": "无权取消此订单"})
-
-            # 修改订单状态为已取消
-            order.status = 'cancelled'
-            order.updated_at = now()
-            order.save()
-
-            return JsonResponse({
-                "code": 0,
-                "msg": "订单已取消",
-                "data": {
-                    "id": order.id,
-                    "buyer_id": order.buyer_id,
-                    "seller_id": order.seller_id,
-                    "book_id": order.book_id,
-                    "price": str(order.price),  # DecimalField 转为字符串
-                    "status": order.status,
-                    "created_at": order.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    "updated_at": order.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                }
-            })
-        except Order.DoesNotExist:
-            return JsonResponse({"code": 1, "msg": "订单不存在"})
+            order = cancel_order(user_id, order_id)
+        except OrderError as e:
+            return JsonResponse({"code": 1, "msg": str(e)})
+
+        return JsonResponse({
+            "code": 0,
+            "msg": "订单已取消",
+            "data": serialize_order(order)
+        })
 
-    return JsonResponse({"code": 1, "msg": "无效的请求方法"})
\ No newline at end of file
+    return JsonResponse({"code": 1, "msg": "无效的请求方法"})
@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+from utils.jwt import authenticate_request
+
+
+def _legacy_authenticate(request):
+    """The pre-decorator path: decode, re-sign a refreshed token, then decode that again"""
+    token = request.headers.get('Authorization').replace('Bearer ', '')
+    access_token = AccessToken(token)
+    access_token.set_exp(lifetime=timedelta(hours=12))
+    refreshed = str(access_token)
+    return AccessToken(refreshed)['user_id']
+
+
+class Command(BaseCommand):
+    help = "Compare per-request JWT authentication cost before and after jwt_required"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        token = AccessToken()
+        token['user_id'] = 1
+        token.set_exp(lifetime=timedelta(hours=12))
+        header = f"Bearer {token}"
+        factory = RequestFactory()
+        count = options['requests']
+
+        def run(authenticate):
+            requests = [factory.get('/', HTTP_AUTHORIZATION=header) for _ in range(count)]
+            started = time.perf_counter()
+            for request in requests:
+                authenticate(request)
+            return (time.perf_counter() - started) / count * 1e6
+
+        legacy = run(_legacy_authenticate)
+        current = run(authenticate_request)
+        self.stdout.write(f"legacy verify_and_refresh_token + AccessToken: {legacy:.1f}us/request")
+        self.stdout.write(f"jwt_required (verify once, refresh near expiry): {current:.1f}us/request")
+        self.stdout.write(f"speedup: {legacy / current:.1f}x")
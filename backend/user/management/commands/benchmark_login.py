@@ -0,0 +1,87 @@
+import contextlib
+import io
+import time
+from django.contrib.auth import authenticate, login
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import JsonResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from user.models import User
+from user.views import login_view
+from utils.jwt import generate_jwt_token
+from utils.seed import SEED_PASSWORD, seeded_test_database
+
+
+def _legacy_login_view(request):
+    """The previous login path: authenticate(), debug lookups on failure, then a session login()"""
+    username = request.POST.get('username')
+    password = request.POST.get('password')
+    user = authenticate(request, username=username, password=password)
+    if user is None:
+        print(f"Authentication failed for username: {username}")
+        try:
+            print(f"User found in database: {User.objects.get(username=username)}")
+        except User.DoesNotExist:
+            print("User does not exist in the database.")
+        return JsonResponse({"code": 1, "msg": "用户名或密码错误"})
+    login(request, user)
+    return JsonResponse({"code": 0, "msg": "登录成功", "token": generate_jwt_token(user)})
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and compare login throughput and queries per login "
+        "of the session-based path and the JWT-only login_view"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument(
+            '--from-hasher', default=None,
+            help="Store the seeded passwords with this hasher algorithm (e.g. pbkdf2_sha256) "
+                 "to measure the upgrade-on-login to the preferred PASSWORD_HASHERS entry",
+        )
+
+    def handle(self, *args, **options):
+        with seeded_test_database(users=options['users'], books=0, categories=0, orders=0) as seeded:
+            if options['from_hasher']:
+                User.objects.update(password=make_password(SEED_PASSWORD, hasher=options['from_hasher']))
+
+            usernames = list(User.objects.filter(id__in=seeded['user_ids']).values_list('username', flat=True))
+            factory = RequestFactory()
+            count = options['logins']
+
+            def run(view, password):
+                handler = SessionMiddleware(view)
+                requests = [
+                    factory.post('/api/user/login', {'username': usernames[i % len(usernames)], 'password': password})
+                    for i in range(count)
+                ]
+                with CaptureQueriesContext(connection) as queries, contextlib.redirect_stdout(io.StringIO()):
+                    started = time.perf_counter()
+                    for request in requests:
+                        handler(request)
+                    elapsed = time.perf_counter() - started
+                return count / elapsed, len(queries) / count
+
+            preferred = get_hasher().algorithm
+            self.stdout.write(f"preferred hasher: {preferred}")
+
+            # The JWT path runs first so any rehash it performs is part of its measurement
+            for label, view in (('jwt login_view', login_view), ('legacy session login', _legacy_login_view)):
+                ok_rate, ok_queries = run(view, SEED_PASSWORD)
+                bad_rate, bad_queries = run(view, 'wrong-password')
+                self.stdout.write(
+                    f"{label:22} success {ok_rate:7.1f} logins/s {ok_queries:4.1f} queries/login  "
+                    f"failure {bad_rate:7.1f} logins/s {bad_queries:4.1f} queries/login"
+                )
+
+            upgraded = sum(
+                1 for password in User.objects.values_list('password', flat=True)
+                if identify_hasher(password).algorithm == preferred
+            )
+            self.stdout.write(f"passwords hashed with {preferred}: {upgraded}/{len(usernames)}")
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from .models import User
+
+
+class UsernameCache:
+    """
+    进程内的用户 id -> 用户名缓存：按 LRU 淘汰，最多 max_entries 条，每条 ttl 秒后过期。
+
+    用户名修改时由 user.signals 主动失效本进程的条目，其他进程最迟 ttl 秒后刷新。
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, user_ids):
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._entries.get(user_id)
+                if entry is None:
+                    continue
+                username, expires_at = entry
+                if expires_at <= now:
+                    del self._entries[user_id]
+                    continue
+                self._entries.move_to_end(user_id)
+                found[user_id] = username
+        return found
+
+    def set_many(self, usernames):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for user_id, username in usernames.items():
+                self._entries[user_id] = (username, expires_at)
+                self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+username_cache = UsernameCache(settings.USERNAME_CACHE_MAX_ENTRIES, settings.USERNAME_CACHE_TTL)
+
+
+def get_usernames(user_ids):
+    """返回 {用户 id: 用户名}，未命中缓存的 id 用一次 IN 查询补齐；不存在的 id 不出现在结果中"""
+    user_ids = set(user_ids)
+    usernames = username_cache.get_many(user_ids)
+    missing = user_ids - usernames.keys()
+    if missing:
+        loaded = dict(User.objects.filter(id__in=missing).values_list('id', 'username'))
+        username_cache.set_many(loaded)
+        usernames.update(loaded)
+    return usernames
+
+
+async def aget_usernames(user_ids):
+    """get_usernames 的异步版本"""
+    user_ids = set(user_ids)
+    usernames = username_cache.get_many(user_ids)
+    missing = user_ids - usernames.keys()
+    if missing:
+        loaded = {user_id: username async for user_id, username in
+                  User.objects.filter(id__in=missing).values_list('id', 'username')}
+        username_cache.set_many(loaded)
+        usernames.update(loaded)
+    return usernames
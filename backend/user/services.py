@@ -0,0 +1,24 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import update_last_login
+from .models import User
+
+
+def authenticate_credentials(username, password):
+    """
+    校验用户名和密码，成功返回用户，失败返回 None。
+
+    供 JWT 登录使用：不创建 session，只查询一次用户。不调用 login() 也就没有
+    user_logged_in 信号，因此成功后在这里直接更新 last_login。check_password 在哈希算法
+    或迭代次数过时时会用当前首选的 PASSWORD_HASHERS 重新哈希并保存密码，
+    因此切换哈希算法后，老用户在下次登录时透明升级。
+    """
+    user = User.objects.filter(username=username).first()
+    if user is None:
+        # 用户不存在时同样计算一次哈希，避免通过响应时间探测用户名是否存在
+        make_password(password)
+        return None
+
+    if not user.check_password(password) or not user.is_active:
+        return None
+    update_last_login(None, user)
+    return user
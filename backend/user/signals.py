@@ -0,0 +1,30 @@
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from book.cache import bump_book_version
+from .models import User
+from .names import username_cache
+from .verification import get_verification_cache
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    # 用户名可能已修改：失效用户名缓存，以及内嵌了 publisher_username 的书籍列表缓存
+    username_cache.discard(instance.id)
+    bump_book_version()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    username_cache.discard(instance.id)
+
+
+@receiver(post_migrate)
+def create_verification_cache_table(sender, using, **kwargs):
+    # 验证码缓存默认使用数据库表：migrate 之后自动建表（已存在则跳过），无需手动 createcachetable
+    if sender.name != 'user' or not isinstance(get_verification_cache(), DatabaseCache):
+        return
+    call_command('createcachetable', database=using, verbosity=0)
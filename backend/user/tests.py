@@ -1,3 +1,97 @@
-from django.test import TestCase
+import re
+from django.core import mail
+from django.test import TestCase, override_settings
+from utils import tasks
+from .models import User
+from .verification import check_code, get_verification_cache
 
-# Create your tests here.
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', BACKGROUND_WORKERS=1)
+class VerificationCodeTests(TestCase):
+    """验证码：邮件发送、按邮箱限流、使用后作废"""
+
+    EMAIL = 'code_user@example.com'
+
+    def setUp(self):
+        get_verification_cache().clear()
+        # 单个后台线程按顺序执行任务，排在发信任务之后的任务完成即说明邮件已发出
+        tasks._executor = None
+        self.addCleanup(self.stop_background_tasks)
+
+    def stop_background_tasks(self):
+        tasks._get_executor().shutdown()
+        tasks._executor = None
+
+    def request_code(self, username='code_user', type='注册', ip='127.0.0.1', email=EMAIL):
+        # 邮件在事务提交后交给后台线程发送
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/user/code', {'username': username, 'email': email, 'type': type}, REMOTE_ADDR=ip
+            )
+        tasks._get_executor().submit(lambda: None).result(timeout=10)
+        return response.json()
+
+    def delivered_code(self):
+        return re.search(r'\d{6}', mail.outbox[-1].body).group()
+
+    def test_code_is_mailed(self):
+        body = self.request_code()
+        self.assertEqual(body['code'], 0)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.EMAIL])
+        self.assertTrue(check_code(self.EMAIL, self.delivered_code()))
+
+    def test_fourth_request_for_same_email_is_rejected(self):
+        # 换 IP 也没用：邮箱的令牌桶容量为 3
+        for i in range(3):
+            self.assertEqual(self.request_code(ip=f'10.0.0.{i}')['code'], 0)
+
+        body = self.request_code(ip='10.0.0.3')
+        self.assertEqual(body['code'], 1)
+        self.assertEqual(body['msg'], '请求过于频繁，请稍后再试')
+        self.assertEqual(len(mail.outbox), 3)
+
+    @override_settings(VERIFICATION_RATE_LIMITS={'email': (1, 600), 'ip': (2, 600)})
+    def test_rejected_request_keeps_ip_quota(self):
+        self.assertEqual(self.request_code()['code'], 0)
+        self.assertEqual(self.request_code()['code'], 1)
+
+        # 被邮箱限流拒绝的请求没有消耗 IP 的令牌，同一 IP 仍可为其他邮箱申请
+        self.assertEqual(self.request_code(email='other_user@example.com')['code'], 0)
+        self.assertEqual(self.request_code(email='third_user@example.com')['code'], 1)
+
+    def test_register_rejects_used_code(self):
+        self.request_code()
+        data = {'username': 'code_user', 'password': 'register-123', 'email': self.EMAIL, 'code': self.delivered_code()}
+
+        self.assertEqual(self.client.post('/api/user/register', data).json()['code'], 0)
+
+        # 删除刚注册的用户，确保第二次被拒绝的原因是验证码而不是邮箱重复
+        User.objects.filter(email=self.EMAIL).delete()
+        body = self.client.post('/api/user/register', data).json()
+        self.assertEqual(body['code'], 1)
+        self.assertEqual(body['msg'], '验证码无效或已过期')
+        self.assertFalse(User.objects.filter(email=self.EMAIL).exists())
+
+    def test_reset_password_rejects_used_code(self):
+        user = User(username='code_user', email=self.EMAIL)
+        user.set_password('old-password-123')
+        user.save()
+
+        self.request_code(type='重置')
+        code = self.delivered_code()
+
+        body = self.client.post(
+            '/api/user/reset', {'email': self.EMAIL, 'code': code, 'new_password': 'new-password-123'}
+        ).json()
+        self.assertEqual(body['code'], 0)
+
+        body = self.client.post(
+            '/api/user/reset', {'email': self.EMAIL, 'code': code, 'new_password': 'other-password-123'}
+        ).json()
+        self.assertEqual(body['code'], 1)
+        self.assertEqual(body['msg'], '验证码无效或已过期')
+
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('new-password-123'))
@@ -0,0 +1,93 @@
+import logging
+import random
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.mail import send_mail
+from django.utils.crypto import constant_time_compare
+from utils.tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+VERIFICATION_CACHE_ALIAS = 'verification'
+
+
+def get_verification_cache():
+    return caches[VERIFICATION_CACHE_ALIAS]
+
+
+def code_key(email):
+    return f'verification_code_{email}'
+
+
+def take_tokens(*buckets):
+    """
+    令牌桶限流：每个桶 (key, capacity, period) 容量为 capacity，每 period 秒匀速补满。
+    所有桶都有令牌时各取走一个并返回 True；任一桶耗尽则一个都不取，返回 False。
+
+    桶状态 (剩余令牌, 上次更新时间) 存在共享缓存中，所有 worker 共用同一组桶。
+    读改写不是原子的，并发请求最多多放行几次，对发验证码的限流足够。
+    """
+    cache = get_verification_cache()
+    now = time.time()
+    states = cache.get_many([key for key, _, _ in buckets])
+
+    levels = []
+    for key, capacity, period in buckets:
+        if key not in states:
+            tokens = capacity
+        else:
+            tokens, updated_at = states[key]
+            tokens = min(capacity, tokens + (now - updated_at) * capacity / period)
+        if tokens < 1:
+            return False
+        levels.append(tokens)
+
+    # 桶空闲 period 秒后必然已补满，与键过期等价
+    for (key, _, period), tokens in zip(buckets, levels):
+        cache.set(key, (tokens - 1, now), timeout=period)
+    return True
+
+
+def allow_code_request(email, ip):
+    """同时按客户端 IP 和目标邮箱限流；先检查两个桶，都有令牌才扣减，被拒绝的请求不消耗任何配额"""
+    limits = settings.VERIFICATION_RATE_LIMITS
+    return take_tokens(
+        (f'verification_rate_ip_{ip}', *limits['ip']),
+        (f'verification_rate_email_{email}', *limits['email']),
+    )
+
+
+def generate_verification_code():
+    return ''.join(random.SystemRandom().choices('0123456789', k=6))
+
+
+def _deliver_code(email, code):
+    send_mail(
+        subject="密码重置验证码",  # 邮件主题
+        message=f"您的验证码是：{code}",  # 邮件内容
+        from_email=settings.EMAIL_FROM,
+        recipient_list=[email],
+        fail_silently=False,  # 失败时抛出异常，由后台任务记录日志
+    )
+
+
+def issue_code(email):
+    """生成验证码写入共享缓存，邮件交给后台线程发送，请求无需等待 SMTP"""
+    code = generate_verification_code()
+    get_verification_cache().set(code_key(email), code, timeout=settings.VERIFICATION_CODE_TTL)
+    run_in_background(_deliver_code, email, code)
+    return code
+
+
+def check_code(email, code):
+    """校验验证码是否与缓存中的一致"""
+    if not email or not code:
+        return False
+    cached_code = get_verification_cache().get(code_key(email))
+    return cached_code is not None and constant_time_compare(cached_code, code)
+
+
+def discard_code(email):
+    """验证码使用后立即作废，避免重复使用"""
+    get_verification_cache().delete(code_key(email))
@@ -1,17 +1,16 @@
 # Create your views here.
-from django.http import JsonResponse
+from django.conf import settings
+from utils.response import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from .forms import RegisterForm
-from django.contrib.auth import authenticate, login
 from .models import User
 from django.core.exceptions import ObjectDoesNotExist
 from utils.jwt import generate_jwt_token
-from django.core.mail import send_mail
-from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from .models import User
-import random
-from backend.settings import EMAIL_FROM
+from .names import aget_usernames
+from .services import authenticate_credentials
+from .verification import allow_code_request, check_code, discard_code, issue_code
 
 @csrf_exempt
 def register_view(request):
@@ -29,10 +28,10 @@ def register_view(request):
 
         if form.is_valid():
             # 验证验证码
-            cached_code = cache.get(f'verification_code_{email}')
-            if cached_code != code:
+            if not check_code(email, code):
                 return JsonResponse({"code": 1, "msg": "验证码无效或已过期"})
             form.save()  # 保存表单数据到数据库
+            discard_code(email)
             return JsonResponse({"code": 0, "msg": "success"})
         else:
             return JsonResponse({"code": 1, "msg": f"注册失败: {form.errors}"})
@@ -50,20 +49,10 @@ def login_view(request):
         if not username or not password:
             return JsonResponse({"code": 1, "msg": "用户名和密码不能为空"})
 
-        # 使用 authenticate 函数验证用户名和密码
-        user = authenticate(request, username=username, password=password)
-        
-        # Debugging: Check if user is None and print additional information
-        if user is None:
-            print(f"Authentication failed for username: {username}")
-            try:
-                user_obj = User.objects.get(username=username)
-                print(f"User found in database: {user_obj}")
-            except User.DoesNotExist:
-                print("User does not exist in the database.")
-        
+        # JWT 接口不使用 session：只校验密码并签发 token，不调用 login()
+        user = authenticate_credentials(username, password)
+
         if user is not None:
-            login(request, user)  # 登录用户
             token = generate_jwt_token(user)
             return JsonResponse({
                 "code": 0,
@@ -75,18 +64,30 @@ def login_view(request):
 
     return JsonResponse({"code": 1, "msg": "无效的请求方法"})
 
-@csrf_exempt
-def get_user_name(request, user_id):
-    try:
-        # 查询数据库获取用户
-        user = User.objects.get(id=user_id)
-        return JsonResponse({"code": 0, "msg": "success", "username": user.username})
-    except User.DoesNotExist:
+# 只读的异步视图（ASGI 下等待数据库时不占用 worker）
+async def get_user_name(request, user_id):
+    # 先查用户名缓存，未命中再查询数据库
+    usernames = await aget_usernames([user_id])
+    if user_id not in usernames:
         return JsonResponse({"code": 1, "msg": "用户不存在"})
+    return JsonResponse({"code": 0, "msg": "success", "username": usernames[user_id]})
+
+# 批量查询用户名：GET /api/user/names?ids=1,2,3，一次 IN 查询返回 {id: 用户名}
+async def get_user_names(request):
+    if request.method == 'GET':
+        try:
+            user_ids = {int(user_id) for user_id in request.GET.get('ids', '').split(',') if user_id.strip()}
+        except ValueError:
+            return JsonResponse({"code": 1, "msg": "ids 参数格式错误"})
 
-# 生成验证码的辅助函数
-def generate_verification_code():
-    return ''.join(random.choices('0123456789', k=6))
+        if len(user_ids) > settings.USERNAME_BATCH_MAX:
+            return JsonResponse({"code": 1, "msg": f"一次最多查询 {settings.USERNAME_BATCH_MAX} 个用户"})
+
+        # 不存在的用户 id 不出现在结果中
+        usernames = await aget_usernames(user_ids)
+        return JsonResponse({"code": 0, "msg": "success", "data": {str(k): v for k, v in usernames.items()}})
+
+    return JsonResponse({"code": 1, "msg": "无效的请求方法"})
 
 # 发送验证邮件视图
 @csrf_exempt
@@ -114,25 +115,13 @@ def send_verification_email(request):
             except ObjectDoesNotExist:
                 return JsonResponse({"code": 1, "msg": "用户名不存在"})
 
-        # 生成验证码
-        verification_code = generate_verification_code()
+        # 按邮箱和 IP 限流，防止刷验证码
+        if not allow_code_request(email, request.META.get('REMOTE_ADDR', '')):
+            return JsonResponse({"code": 1, "msg": "请求过于频繁，请稍后再试"})
 
-        # 保存验证码到缓存，超时时间为 5 分钟
-        cache.set(f'verification_code_{email}', verification_code, timeout=120)
-
-        # 发送邮件
-        try:
-            send_mail(
-                subject="密码重置验证码",  # 邮件主题
-                message=f"您的验证码是：{verification_code}",  # 邮件内容
-                from_email=EMAIL_FROM,  # 使用默认发件人
-                recipient_list=[email],  # 收件人列表
-                fail_silently=False,  # 出现错误时不忽略
-            )
-            return JsonResponse({"code": 0, "msg": "验证码已发送，请检查您的邮箱"})
-        except Exception as e:
-            print(f"Error: {e}")
-            return JsonResponse({"code": 1, "msg": "邮件发送失败，请稍后再试"})
+        # 生成验证码并保存到共享缓存，邮件由后台线程发送
+        issue_code(email)
+        return JsonResponse({"code": 0, "msg": "验证码已发送，请检查您的邮箱"})
 
     return JsonResponse({"code": 1, "msg": "无效的请求方法"})
 
@@ -148,14 +137,14 @@ def reset_password(request):
             return JsonResponse({"code": 1, "msg": "参数不完整"})
 
         # 验证验证码
-        cached_code = cache.get(f'verification_code_{email}')
-        if cached_code != code:
+        if not check_code(email, code):
             return JsonResponse({"code": 1, "msg": "验证码无效或已过期"})
 
         try:
             user = User.objects.get(email=email)
             user.set_password(new_password)
-            user.save()
+            user.save(update_fields=['password', 'updated_at'])
+            discard_code(email)
             return JsonResponse({"code": 0, "msg": "密码重置成功"})
         except User.DoesNotExist:
             return JsonResponse({"code": 1, "msg": "用户不存在"})
@@ -0,0 +1,119 @@
+import gzip
+import re
+import zlib
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+_ACCEPT_ENCODING_RE = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q=([0-9.]+))?')
+
+
+def choose_encoding(accept_encoding):
+    """Pick br (when the brotli package is installed) or gzip from an Accept-Encoding header"""
+    accepted = {}
+    for coding, q in _ACCEPT_ENCODING_RE.findall(accept_encoding):
+        try:
+            accepted[coding.lower()] = float(q) if q else 1.0
+        except ValueError:
+            continue
+    for coding in (('br', 'gzip') if brotli else ('gzip',)):
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def _compress(content, coding):
+    if coding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+
+def _stream_compressor(coding):
+    """Return (compress, finish) callables; each compressed chunk is flushed so streaming keeps flowing"""
+    if coding == 'br':
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return lambda chunk: compressor.process(chunk) + compressor.flush(), compressor.finish
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+    return lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _compress_stream(chunks, coding):
+    compress, finish = _stream_compressor(coding)
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def _acompress_stream(chunks, coding):
+    compress, finish = _stream_compressor(coding)
+    async for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with br or gzip, as negotiated through Accept-Encoding.
+
+    Bodies shorter than COMPRESSION_MIN_SIZE are sent as they are, since the
+    CPU cost outweighs the bytes saved. Streaming responses are compressed
+    chunk by chunk without buffering. Images (covers) are already compressed
+    and are skipped.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.get('Content-Type', '').startswith('image/'):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            if getattr(response, 'is_async', False):
+                response.streaming_content = _acompress_stream(response.streaming_content, coding)
+            else:
+                response.streaming_content = _compress_stream(response.streaming_content, coding)
+            del response['Content-Length']
+        else:
+            compressed = _compress(response.content, coding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The encoded bytes differ from the identity body, so a strong ETag becomes weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,34 @@
+import hashlib
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Build a strong ETag from values that change whenever the response body does"""
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def not_modified(request, etag=None, last_modified=None, cache_control='no-cache'):
+    """
+    Return a 304 response if the request's If-None-Match / If-Modified-Since
+    validators still match, otherwise None.
+
+    Meant to run before the body is built, so an unchanged resource costs only
+    the probe that produced `etag` / `last_modified` (an aware datetime).
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified, cache_control)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None, cache_control='no-cache'):
+    """Attach ETag / Last-Modified; no-cache makes clients revalidate on every use instead of guessing freshness"""
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = cache_control
+    return response
@@ -1,12 +1,13 @@
-from rest_framework_simplejwt.tokens import RefreshToken
+from functools import wraps
 from datetime import timedelta
+from django.conf import settings
+from utils.response import JsonResponse
+from django.utils.timezone import now
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.tokens import AccessToken
 
 # 生成JWT token的函数
 def generate_jwt_token(user):
-    refresh = RefreshToken.for_user(user)
-
     # 获取access token，并设置有效期为12小时
     access_token = AccessToken.for_user(user)
 
@@ -15,8 +16,11 @@ def generate_jwt_token(user):
 
     return str(access_token)  # 返回生成的 access_token
 
-# 验证token（涉及到需要用户个人服务都需要验证token）
-def verify_and_refresh_token(request):
+# 验证token（每个请求只解码、验签一次，结果缓存在 request 上）
+def authenticate_request(request):
+    if hasattr(request, 'jwt_claims'):
+        return request.jwt_claims
+
     token = request.headers.get('Authorization')  # 从请求头中获取Authorization字段
 
     if not token:
@@ -26,14 +30,39 @@ def verify_and_refresh_token(request):
     token = token.replace('Bearer ', '')
 
     try:
-        # 验证 token
+        # 验证 token（签名与过期时间）
         access_token = AccessToken(token)
+        # simplejwt >= 5.5 把 user_id 声明写成字符串；统一转成 int，与外键 id 比较、排序时类型一致
+        user_id = int(access_token['user_id'])
+    except Exception as e:
+        raise AuthenticationFailed(f'Token is invalid or expired: {str(e)}')
 
-        # 刷新 token（设置新的过期时间为12小时）
-        access_token.set_exp(lifetime=timedelta(hours=12))  # 12小时有效期
+    # 仅在即将过期时才重新签发 token（设置新的过期时间为12小时）
+    refreshed_token = None
+    remaining = access_token['exp'] - now().timestamp()
+    if remaining < settings.JWT_REFRESH_THRESHOLD.total_seconds():
+        access_token.set_exp(lifetime=timedelta(hours=12))
+        refreshed_token = str(access_token)
 
-        # 返回新的 token
-        return str(access_token)
+    request.jwt_claims = access_token.payload
+    request.user_id = user_id
+    request.refreshed_token = refreshed_token
+    return request.jwt_claims
 
-    except Exception as e:
-        raise AuthenticationFailed(f'Token is invalid or expired: {str(e)}')
\ No newline at end of file
+# 需要登录的视图装饰器：验证通过后视图通过 request.user_id 获取当前用户
+def jwt_required(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            authenticate_request(request)
+        except AuthenticationFailed as e:
+            return JsonResponse({"code": 1, "msg": f"Token 验证失败: {e.detail}"})
+
+        response = view_func(request, *args, **kwargs)
+
+        # 刷新后的 token 通过响应头返回给前端
+        if request.refreshed_token:
+            response['X-Refreshed-Token'] = request.refreshed_token
+        return response
+
+    return wrapper
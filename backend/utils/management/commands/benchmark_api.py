@@ -0,0 +1,304 @@
+import json
+import random
+import re
+import socket
+import subprocess
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+from django.core.management.base import BaseCommand, CommandError
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.test.utils import override_settings
+from book.models import Book
+from user.models import User
+from utils.seed import SEED_PASSWORD, seeded_test_database
+
+try:
+    import uvicorn
+except ImportError:  # Only needed for --server asgi
+    uvicorn = None
+
+# MetricsMiddleware reports the query count and new DB connections of each request in Server-Timing
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+CONNECTIONS_RE = re.compile(r'desc="(\d+) opened"')
+
+DEFAULT_MIX = 'list=30,search=15,detail=30,buy=10,pay=5,login=10'
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    Handle requests on a fixed set of worker threads, like a real app server.
+
+    A thread per request (ThreadingMixIn) would open a fresh DB connection for
+    every request and hide the effect of CONN_MAX_AGE.
+    """
+    workers = 16
+
+    def server_activate(self):
+        super().server_activate()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        # CONN_MAX_AGE keeps each worker's connection open past its last request, and
+        # destroying the test database fails while any is left. Every worker closes its own:
+        # the barrier holds each task until all are running, so no thread runs two.
+        barrier = threading.Barrier(self.workers)
+
+        def close_connections():
+            connections.close_all()
+            barrier.wait(timeout=30)
+
+        for _ in range(self.workers):
+            self.executor.submit(close_connections)
+        self.executor.shutdown(wait=True)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadedUvicornServer(uvicorn.Server if uvicorn else object):
+    def install_signal_handlers(self):
+        pass  # Runs outside the main thread
+
+
+def serve_wsgi(workers):
+    server_class = type('PooledWSGIServer', (PooledWSGIServer,), {'workers': workers})
+    server = make_server('127.0.0.1', 0, get_wsgi_application(), server_class=server_class, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+    return server.server_port, stop
+
+
+def serve_asgi():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    server = ThreadedUvicornServer(uvicorn.Config(get_asgi_application(), log_level='warning', lifespan='off'))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+        sock.close()
+        # Sync views ran on asgiref's executor threads, whose persistent connections cannot be
+        # closed from here; end those sessions so the test database can be destroyed
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+            )
+    return sock.getsockname()[1], stop
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database, serve the API locally and drive mixed read/write traffic; "
+        "reports throughput, latency percentiles and queries per request, and saves them as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--books', type=int, default=20000)
+        parser.add_argument('--categories', type=int, default=100)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Weighted operations (default: {DEFAULT_MIX})")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi',
+                            help="Serve through a threaded WSGI server or uvicorn (ASGI, async views)")
+
+    def handle(self, *args, **options):
+        if options['server'] == 'asgi' and uvicorn is None:
+            raise CommandError("--server asgi requires uvicorn to be installed")
+        self.rng = random.Random(options['seed'])
+        self.rng_lock = threading.Lock()
+        mix = {
+            name: int(weight)
+            for name, weight in (item.split('=') for item in options['mix'].split(','))
+        }
+
+        sizes = {key: options[key] for key in ('users', 'books', 'categories', 'orders')}
+        with seeded_test_database(log=self.stdout.write, seed=options['seed'], **sizes), \
+                override_settings(ALLOWED_HOSTS=['127.0.0.1']):
+            self.users = list(User.objects.values_list('id', 'username'))
+            self.book_ids = list(Book.objects.values_list('id', flat=True))
+            self.available = list(Book.objects.filter(status='available').values_list('id', 'publisher_id'))
+            self.pending = []
+            self.tokens = {}
+            self.connections_opened = 0
+
+            port, stop = serve_asgi() if options['server'] == 'asgi' else serve_wsgi(options['concurrency'])
+            self.base_url = f'http://127.0.0.1:{port}'
+            try:
+                results = self.run(mix, options['requests'], options['concurrency'])
+            finally:
+                stop()
+
+            # Reported before the test database is destroyed, so a failed teardown cannot lose the results
+            report = self.report(results, options, mix)
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def choice(self, items):
+        with self.rng_lock:
+            return self.rng.choice(items)
+
+    def request(self, method, path, data=None, token=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        if token:
+            request.add_header('Authorization', f'Bearer {token}')
+        started = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=30) as response:
+            payload = json.loads(response.read())
+            server_timing = response.headers.get('Server-Timing', '')
+        elapsed = time.perf_counter() - started
+        match = QUERIES_RE.search(server_timing)
+        queries = int(match.group(1)) if match else 0
+        match = CONNECTIONS_RE.search(server_timing)
+        with self.rng_lock:
+            self.connections_opened += int(match.group(1)) if match else 0
+        return elapsed, payload, queries
+
+    def login(self, user_id, username):
+        elapsed, payload, queries = self.request(
+            'POST', '/api/user/login', {'username': username, 'password': SEED_PASSWORD}
+        )
+        if payload.get('code') == 0:
+            self.tokens[user_id] = payload['token']
+        return elapsed, payload, queries
+
+    def token_for(self, user_id):
+        if user_id not in self.tokens:
+            self.login(user_id, dict(self.users)[user_id])
+        return self.tokens[user_id]
+
+    def operation(self, name):
+        if name == 'list':
+            return self.request('GET', '/api/book/list')
+        if name == 'search':
+            return self.request('GET', '/api/book/search?query=' + self.choice(['python', 'database', 'novel']))
+        if name == 'detail':
+            return self.request('GET', f'/api/book/{self.choice(self.book_ids)}')
+        if name == 'login':
+            return self.login(*self.choice(self.users))
+        if name == 'buy':
+            book_id, seller_id = self.choice(self.available)
+            buyer_id = self.choice([user_id for user_id, _ in self.users if user_id != seller_id])
+            token = self.token_for(buyer_id)
+            result = self.request('POST', '/api/order/buy', {'book_id': book_id}, token)
+            if result[1].get('code') == 0:
+                self.pending.append((buyer_id, result[1]['data']['id']))
+                with self.rng_lock:
+                    if (book_id, seller_id) in self.available:
+                        self.available.remove((book_id, seller_id))
+            return result
+        if name == 'pay':
+            if not self.pending:
+                return self.operation('buy')
+            buyer_id, order_id = self.pending.pop()
+            return self.request('POST', '/api/order/pay', {'order_id': order_id}, self.token_for(buyer_id))
+        raise ValueError(f'Unknown operation {name}')
+
+    def run(self, mix, total, concurrency):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        plan = self.rng.choices(names, weights=weights, k=total)
+        results = defaultdict(list)
+
+        def execute(name):
+            try:
+                elapsed, payload, queries = self.operation(name)
+                results[name].append((elapsed, payload.get('code') == 0, queries))
+            except Exception:
+                results[name].append((None, False, 0))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(execute, plan))
+        self.elapsed = time.perf_counter() - started
+        return results
+
+    def report(self, results, options, mix):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+
+        endpoints = {}
+        total = 0
+        for name, samples in sorted(results.items()):
+            latencies = [elapsed for elapsed, _, _ in samples if elapsed is not None]
+            queries = [count for elapsed, _, count in samples if elapsed is not None]
+            total += len(samples)
+            endpoints[name] = {
+                'requests': len(samples),
+                'errors': sum(1 for _, ok, _ in samples if not ok),
+                'throughput_rps': round(len(samples) / self.elapsed, 2),
+                'latency_ms': {
+                    label: round(percentile(latencies, p) * 1000, 3) if latencies else None
+                    for label, p in (('p50', 0.50), ('p90', 0.90), ('p99', 0.99))
+                },
+                'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+            }
+            self.stdout.write(
+                f"{name:8} {len(samples):6} req  {endpoints[name]['errors']:4} err  "
+                f"p50 {endpoints[name]['latency_ms']['p50']}ms  p99 {endpoints[name]['latency_ms']['p99']}ms  "
+                f"{endpoints[name]['queries_per_request']} queries/req"
+            )
+
+        self.stdout.write(f"total    {total} requests in {self.elapsed:.2f}s ({total / self.elapsed:.0f} req/s)")
+        self.stdout.write(f"DB connections opened: {self.connections_opened} ({self.connections_opened / total:.3f}/req)")
+        return {
+            'commit': commit,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'config': {
+                key: options[key]
+                for key in ('server', 'users', 'books', 'categories', 'orders', 'requests', 'concurrency', 'seed')
+            } | {
+                'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            },
+            'mix': mix,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'throughput_rps': round(total / self.elapsed, 2),
+            'db_connections_opened': self.connections_opened,
+            'endpoints': endpoints,
+        }
@@ -0,0 +1,62 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from utils import response
+
+
+def build_book_list(rows, seed):
+    """A synthetic book list page shaped like book_list_view's payload"""
+    rng = random.Random(seed)
+    started = now()
+    return {
+        "code": 0,
+        "data": [
+            {
+                "id": i,
+                "title": f"Seed book {i} {rng.choice(['python', '数据库', 'history', '小说'])}",
+                "publisher_id": rng.randrange(1000),
+                "publisher_username": f"seed_user_{rng.randrange(1000)}",
+                "author": f"Author {rng.randrange(rows // 10 + 1)}",
+                "price": Decimal(rng.randint(100, 20000)) / 100,
+                "status": rng.choice(['available', 'reserved', 'sold']),
+                "created_at": started - timedelta(seconds=i, microseconds=rng.randrange(1000000)),
+                "cover_url": f"https://img.example.com/{i}.jpg",
+                "cover_thumb_url": None,
+                "categories": [f"seed_category_{rng.randrange(50)}" for _ in range(rng.randint(1, 3))],
+            }
+            for i in range(rows)
+        ],
+        "next_cursor": "WyIyMDI0LTAxLTAxVDAwOjAwOjAwKzAwOjAwIiwxXQ",
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare JSON encode time of a large book list: Django's JsonResponse encoder vs orjson in utils.response"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        payload = build_book_list(options['rows'], options['seed'])
+        encoders = [('django JsonResponse (DjangoJSONEncoder)', response.django_dumps)]
+        if response.orjson is not None:
+            encoders.append(('utils.response orjson', response.dumps))
+        else:
+            self.stdout.write("orjson is not installed; utils.response falls back to DjangoJSONEncoder")
+
+        baseline = None
+        for label, encode in encoders:
+            encode(payload)  # warm up
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                body = encode(payload)
+            per_call = (time.perf_counter() - started) / options['repeat'] * 1000
+            baseline = baseline or per_call
+            self.stdout.write(
+                f"{label:42} {per_call:8.2f} ms/encode  {len(body) / 1024:8.1f} KiB  {baseline / per_call:5.2f}x"
+            )
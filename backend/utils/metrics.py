@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# Per-request counters; a ContextVar so queries issued from sync_to_async threads
+# under ASGI are still attributed to the request that made them.
+_current_stats = ContextVar('request_db_stats', default=None)
+
+
+class _RequestStats:
+    __slots__ = ('queries', 'db_time', 'connections')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.connections = 0
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # Installed once per connection object; outside a request it is a single ContextVar lookup
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+    # A request that had to open a connection pays the connection setup cost
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.connections += 1
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram keyed by a single 'view' label"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, view, value):
+        series = self.series.get(view)
+        if series is None:
+            series = self.series[view] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for view, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{view="{view}",le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{view="{view}"}} {total}')
+            lines.append(f'{self.name}_count{{view="{view}"}} {count}')
+        return lines
+
+
+_lock = threading.Lock()
+_histograms = [
+    Histogram('http_request_duration_seconds', "Wall time spent handling the request",
+              (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)),
+    Histogram('http_request_db_seconds', "Time spent in SQL queries",
+              (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)),
+    Histogram('http_request_queries', "SQL queries issued",
+              (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)),
+    Histogram('http_response_size_bytes', "Response body size",
+              (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)),
+]
+_over_budget = {}
+_connections_opened = {}
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.url_name or match.view_name) if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    Record wall time, DB time, query count and response size per URL name.
+
+    Adds a Server-Timing header, logs requests over METRICS_QUERY_BUDGET
+    queries and feeds the histograms served by metrics_view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = _RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = _RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    def finish(self, request, response, stats, elapsed):
+        view = _view_name(request)
+        if response.streaming:
+            size = int(response.get('Content-Length', 0))
+        else:
+            size = len(response.content)
+
+        with _lock:
+            for histogram, value in zip(_histograms, (elapsed, stats.db_time, stats.queries, size)):
+                histogram.observe(view, value)
+            if stats.queries > settings.METRICS_QUERY_BUDGET:
+                _over_budget[view] = _over_budget.get(view, 0) + 1
+            if stats.connections:
+                _connections_opened[view] = _connections_opened.get(view, 0) + stats.connections
+
+        if stats.queries > settings.METRICS_QUERY_BUDGET:
+            logger.warning(
+                "%s %s (%s) issued %d queries, over the budget of %d",
+                request.method, request.path, view, stats.queries, settings.METRICS_QUERY_BUDGET,
+            )
+
+        response['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f'conn;desc="{stats.connections} opened"'
+        )
+        return response
+
+
+def metrics_view(request):
+    """Prometheus text exposition of this worker's request metrics"""
+    with _lock:
+        lines = []
+        for histogram in _histograms:
+            lines.extend(histogram.render())
+        lines.append("# HELP http_requests_over_query_budget_total Requests that exceeded METRICS_QUERY_BUDGET")
+        lines.append("# TYPE http_requests_over_query_budget_total counter")
+        for view, count in sorted(_over_budget.items()):
+            lines.append(f'http_requests_over_query_budget_total{{view="{view}"}} {count}')
+        lines.append("# HELP db_connections_opened_total Database connections opened while handling requests")
+        lines.append("# TYPE db_connections_opened_total counter")
+        for view, count in sorted(_connections_opened.items()):
+            lines.append(f'db_connections_opened_total{{view="{view}"}} {count}')
+    return HttpResponse("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4")
@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import datetime
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidPageRequest(ValueError):
+    """Raised when the cursor or page size sent by the client cannot be used"""
+
+
+def encode_cursor(values):
+    """Encode the key values of the last row of a page into an opaque cursor string"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, keys):
+    """Decode a cursor produced by encode_cursor back into typed key values"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidPageRequest('Invalid cursor')
+
+    if not isinstance(payload, list) or len(payload) != len(keys):
+        raise InvalidPageRequest('Invalid cursor')
+
+    values = []
+    for key, value in zip(keys, payload):
+        # None cannot be compared against in the cursor filter
+        if value is None:
+            raise InvalidPageRequest('Invalid cursor')
+        try:
+            field = model._meta.get_field(key)
+        except FieldDoesNotExist:
+            # Annotated keys (e.g. a search rank) have no model field to convert through
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise InvalidPageRequest('Invalid cursor')
+            values.append(value)
+            continue
+        try:
+            values.append(field.to_python(value))
+        except (ValidationError, TypeError, ValueError):
+            # e.g. a number where a datetime string belongs makes fromisoformat raise TypeError
+            raise InvalidPageRequest('Invalid cursor')
+    return values
+
+
+def get_page_size(request):
+    """Read ?page_size= from the request, falling back to settings.API_PAGE_SIZE"""
+    page_size = request.GET.get('page_size')
+    if not page_size:
+        return settings.API_PAGE_SIZE
+    try:
+        page_size = int(page_size)
+    except ValueError:
+        raise InvalidPageRequest('Invalid page_size')
+    if page_size <= 0:
+        raise InvalidPageRequest('Invalid page_size')
+    return min(page_size, settings.API_MAX_PAGE_SIZE)
+
+
+def _after_cursor(keys, values):
+    """Build the filter selecting rows strictly after `values` in descending key order"""
+    # The leading <= bound lets the database range-scan the composite index on `keys`
+    condition = Q()
+    for i, key in enumerate(keys):
+        step = Q(**{f'{key}__lt': values[i]})
+        for prev_key, prev_value in zip(keys[:i], values[:i]):
+            step &= Q(**{prev_key: prev_value})
+        condition |= step
+    return Q(**{f'{keys[0]}__lte': values[0]}) & condition
+
+
+def _page_queryset(queryset, request, keys):
+    """Apply ordering, the cursor filter and the page limit (plus one look-ahead row)"""
+    page_size = get_page_size(request)
+    queryset = queryset.order_by(*[f'-{key}' for key in keys])
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, keys)
+        queryset = queryset.filter(_after_cursor(keys, values))
+
+    return queryset[:page_size + 1], page_size
+
+
+def _finish_page(rows, page_size, keys):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor([last[key] for key in keys])
+        else:
+            next_cursor = encode_cursor([getattr(last, key) for key in keys])
+    return rows, next_cursor
+
+
+def keyset_paginate(queryset, request, keys=('created_at', 'id')):
+    """
+    Return (rows, next_cursor) for one page of `queryset`, newest first.
+
+    Pages are keyed on `keys` rather than OFFSET, so deep pages cost the same
+    as the first one. A request without ?cursor= gets the first page.
+    """
+    queryset, page_size = _page_queryset(queryset, request, keys)
+    return _finish_page(list(queryset), page_size, keys)
+
+
+async def akeyset_paginate(queryset, request, keys=('created_at', 'id')):
+    """Async counterpart of keyset_paginate for async views"""
+    queryset, page_size = _page_queryset(queryset, request, keys)
+    return _finish_page([row async for row in queryset], page_size, keys)
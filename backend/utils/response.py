@@ -0,0 +1,84 @@
+import decimal
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.functional import Promise
+
+try:
+    import orjson
+except ImportError:  # Falls back to Django's encoder below
+    orjson = None
+
+
+# orjson is optional. Without it, bodies are encoded exactly as django.http.JsonResponse
+# encodes them. With it, the values are the same JSON, but datetimes keep their
+# microseconds and non-ASCII text is written as UTF-8 rather than \u escapes.
+
+def _orjson_default(value):
+    if isinstance(value, (decimal.Decimal, Promise)):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def django_dumps(data):
+    """Encode `data` to JSON bytes with DjangoJSONEncoder, as django.http.JsonResponse does"""
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def dumps(data):
+        """Encode `data` to JSON bytes"""
+        return orjson.dumps(data, default=_orjson_default, option=_ORJSON_OPTIONS)
+else:
+    dumps = django_dumps
+
+
+class JsonResponse(HttpResponse):
+    """
+    Drop-in replacement for django.http.JsonResponse encoded with dumps.
+
+    Datetimes, Decimals and UUIDs are converted by the encoder itself, so views
+    hand over ORM values as they are instead of formatting them field by field.
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
+
+
+class StreamingJsonResponse(StreamingHttpResponse):
+    """
+    Stream {"code": 0, "<key>": [...]} without building the whole body.
+
+    `chunks` yields lists of items; pass an async iterator when serving under
+    ASGI. Each list is encoded and sent on its own, so only one chunk is held in
+    memory however many items there are. An error raised mid-stream truncates
+    the document, which the client sees as invalid JSON.
+    """
+
+    def __init__(self, chunks, key='data', **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        encode = self._aencode if hasattr(chunks, '__aiter__') else self._encode
+        super().__init__(encode(chunks, key), **kwargs)
+
+    @staticmethod
+    def _encode(chunks, key):
+        yield b'{"code":0,' + dumps(key) + b':['
+        separator = b''
+        for chunk in chunks:
+            if chunk:
+                yield separator + dumps(chunk)[1:-1]  # the items without the enclosing []
+                separator = b','
+        yield b']}'
+
+    @staticmethod
+    async def _aencode(chunks, key):
+        yield b'{"code":0,' + dumps(key) + b':['
+        separator = b''
+        async for chunk in chunks:
+            if chunk:
+                yield separator + dumps(chunk)[1:-1]
+                separator = b','
+        yield b']}'
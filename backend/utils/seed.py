@@ -0,0 +1,119 @@
+import random
+from contextlib import contextmanager
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from user.models import User
+from book.models import Book, Category, BookCategory
+from book.search import refresh_search_vector
+from order.models import Order
+from order.summary import rebuild_order_summaries
+
+SEED_PASSWORD = 'seed-password-123'
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def seed_dataset(users=100, books=10000, categories=50, orders=5000, batch_size=2000, seed=0, log=None):
+    """
+    Bulk-insert a synthetic catalog for benchmarks and EXPLAIN runs.
+
+    Every seeded user has the password SEED_PASSWORD. Each book gets one to
+    three categories and at most one order. Returns the ids of what was created.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    password = make_password(SEED_PASSWORD)  # 只计算一次哈希，所有用户共用
+
+    with transaction.atomic():
+        user_objects = User.objects.bulk_create(
+            [User(username=f'seed_user_{seed}_{i}', email=f'seed_{seed}_{i}@example.com', password=password)
+             for i in range(users)],
+            batch_size=batch_size,
+        )
+        user_ids = [user.id for user in user_objects]
+        log(f"Seeded {len(user_ids)} users")
+
+        category_objects = Category.objects.bulk_create(
+            [Category(name=f'seed_category_{seed}_{i}') for i in range(categories)],
+            batch_size=batch_size,
+        )
+        category_ids = [category.id for category in category_objects]
+
+    book_ids = []
+    for chunk in _batches(range(books), batch_size):
+        with transaction.atomic():
+            created = Book.objects.bulk_create([
+                Book(
+                    title=f'Seed book {i} {rng.choice(["python", "database", "history", "novel", "math"])}',
+                    author=f'Author {rng.randrange(max(books // 10, 1))}',
+                    description=f'Synthetic description for book {i}',
+                    publisher_id=rng.choice(user_ids),
+                    price=Decimal(rng.randint(100, 20000)) / 100,
+                    status='available',
+                )
+                for i in chunk
+            ])
+            ids = [book.id for book in created]
+            BookCategory.objects.bulk_create(
+                [BookCategory(book_id=book_id, category_id=category_id)
+                 for book_id in ids
+                 for category_id in rng.sample(category_ids, min(len(category_ids), rng.randint(1, 3)))],
+                ignore_conflicts=True,
+            )
+            refresh_search_vector(ids)
+        book_ids.extend(ids)
+        log(f"Seeded {len(book_ids)} books")
+
+    publishers = dict(Book.objects.filter(id__in=book_ids).values_list('id', 'publisher_id')) if orders else {}
+    order_ids = []
+    for chunk in _batches(rng.sample(book_ids, min(orders, len(book_ids))), batch_size):
+        with transaction.atomic():
+            order_objects = []
+            for book_id in chunk:
+                seller_id = publishers[book_id]
+                buyer_id = rng.choice(user_ids)
+                if buyer_id == seller_id:
+                    continue
+                order_objects.append(Order(
+                    buyer_id=buyer_id,
+                    seller_id=seller_id,
+                    book_id=book_id,
+                    price=Decimal(rng.randint(100, 20000)) / 100,
+                    status=rng.choice(['pending', 'paid', 'cancelled']),
+                ))
+            created = Order.objects.bulk_create(order_objects)
+            Book.objects.filter(id__in=[order.book_id for order in created if order.status == 'paid']) \
+                .update(status='sold')
+            Book.objects.filter(id__in=[order.book_id for order in created if order.status == 'pending']) \
+                .update(status='reserved')
+        order_ids.extend(order.id for order in created)
+        log(f"Seeded {len(order_ids)} orders")
+
+    # bulk_create 绕过了 order.services，汇总表需要按订单重新聚合
+    rebuild_order_summaries(batch_size=batch_size)
+
+    return {
+        'user_ids': user_ids,
+        'category_ids': category_ids,
+        'book_ids': book_ids,
+        'order_ids': order_ids,
+    }
+
+
+@contextmanager
+def seeded_test_database(log=None, **sizes):
+    """
+    Create a throwaway test database (like the test runner does), seed it and
+    yield the seeded ids; the database is destroyed on exit so the configured
+    one is never touched.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield seed_dataset(log=log, **sizes)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
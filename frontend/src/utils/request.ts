@@ -31,9 +31,20 @@ request.interceptors.request.use(
 );
 
 
+// 后端在 token 即将过期时通过 X-Refreshed-Token 响应头返回新 token，替换本地保存的 token
+export const storeRefreshedToken = (response: AxiosResponse) => {
+  const refreshedToken = response.headers['x-refreshed-token'];
+  if (refreshedToken) {
+    localStorage.setItem('auth_token', refreshedToken);
+  }
+};
+
 // 响应拦截器：可以处理全局的响应错误
 request.interceptors.response.use(
-  (response: AxiosResponse) => response.data,
+  (response: AxiosResponse) => {
+    storeRefreshedToken(response);
+    return response.data;
+  },
   (error: any) => {
     console.error('请求失败：', error);
     return Promise.reject(error);